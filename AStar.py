@@ -1,40 +1,249 @@
 import heapq
 from time import time
 
-MAX_ELAPSED_TIME = 60*10
+from Budget import SearchBudget, get_budget
+from OpenList import OPEN_LISTS
+from Profiler import VisitHistory
+from PuzzleState import PuzzleState, SolutionPath
 
 
 class AStarSolver:
-    def __init__(self, board, heuristic='manhattan'):
+    def __init__(self, board, heuristic='manhattan', open_list='heap', profiler=None):
+        self.heuristic = heuristic
+        self.open_list = open_list
+        self.profiler = profiler
+        self.history = VisitHistory()
+        self.reset(board)
+
+    def reset(self, board):
+        """
+            Sets the solver up to solve another board, with the same configuration and history dict
+        """
         self.solution = []
         self.initial_board = board
-        self.heuristic = heuristic
         self.nodes_expanded = 1
-        self.history = {}
-        self.s_time = time()
+        self.history.clear()
+        self.peak_open = 0
+        self.peak_closed = 0
+        self.stop_reason = None
+        self.f_bound = None
+
+    def solve(self, budget=None):
+        """
+            States are keyed by their packed tiles. A successor is pushed only if it improves the best g
+            known for its state, and the open list ('heap', 'bucket' or 'bucket_lifo') breaks f ties
+            on the lowest h (so the highest g), except for 'bucket_lifo' which pops the latest push.
+            The move that reached each state is kept with its best g, the solution path is rebuilt from them.
+            A profiler times the heuristic, the open list and the best-g map through its proxies.
+            Out of budget (the default time limit without one), the search stops with NOT_FOUND, stop_reason
+            and f_bound: the lowest f still open, which the optimal cost is at least
+        """
+        budget = get_budget(budget)
+        start = PuzzleState.from_board(self.initial_board, self.heuristic)
+        space = start.space
+        heuristic, moves, shifts, mask, goal_key = space.heuristic, space.moves, space.shifts, space.mask, space.goal_key
 
-    def solve(self):
-        frontier = []
-        heapq.heappush(frontier, (self.initial_board.f_value(self.heuristic), self.initial_board))
+        best_g = {start.key: 0}
+        parent_moves = {}
+        closed = set()
+        frontier = OPEN_LISTS[self.open_list]()
+        prof = self.profiler
+        if prof is not None:
+            prof.start()
+            heuristic = prof.wrap_heuristic(heuristic)
+            best_g = prof.wrap_dict(best_g)
+            frontier = prof.wrap_open_list(frontier)
+        frontier.push(start.h, start.h, start.key, start.blank, start.aux)
+        self.peak_open = 1
 
         while frontier:
-            f, board = heapq.heappop(frontier)
-            self.solution.append(board)
-            if getattr(board, self.heuristic) == 0:
-                self.solution.append(board)
+            f, h, key, blank, aux = frontier.pop()
+            self.history.visit(key)
+            g = f - h
+            if g > best_g[key]:  # A better path to this state was pushed after this one
+                continue
+
+            if key == goal_key:
+                self.solution = SolutionPath.from_parent_moves(space, start.key, key, parent_moves)
+                self.f_bound = f
+                if prof is not None:
+                    prof.stop()
                 return f
 
-            if time()-self.s_time > MAX_ELAPSED_TIME:
-                return 'NOT_FOUND'
+            if self.nodes_expanded >= budget.next_check and budget.check(self.nodes_expanded):
+                self.stop_reason, self.f_bound = budget.reason, f
+                break
 
-            board_str = str(board)
-            if str(board) not in self.history:
-                self.history[board_str] = 1
-                next_possible_board_list = board.get_possible_next_board(self.heuristic)
-                for next_board in next_possible_board_list:
-                    heapq.heappush(frontier, (next_board.f_value(self.heuristic), next_board))
-                    self.nodes_expanded += 1
-            else:
-                self.history[board_str] += 1
+            closed.add(key)
+            next_g = g + 1
+            generated = self.nodes_expanded
+            for next_blank, move in moves[blank]:
+                shift = shifts[next_blank]
+                tile = (key >> shift) & mask
+                next_key = key - (tile << shift) + (tile << shifts[blank])
+                if best_g.get(next_key, next_g + 1) <= next_g:
+                    continue
+                best_g[next_key] = next_g
+                parent_moves[next_key] = move
+                next_h, next_aux = heuristic.update(h, aux, tile, next_blank, blank)
+                frontier.push(next_g + next_h, next_h, next_key, next_blank, next_aux)
+                self.nodes_expanded += 1
+            if prof is not None:
+                prof.expand(len(moves[blank]), self.nodes_expanded - generated)
 
+            if len(frontier) > self.peak_open:
+                self.peak_open = len(frontier)
+            self.peak_closed = len(closed)
+
+        if prof is not None:
+            prof.stop()
         return 'NOT_FOUND'
+
+
+class ARAStarSolver(AStarSolver):
+    """
+        Anytime repairing A*: weighted A* ordered on g + epsilon * h, whose first solution costs at most epsilon
+        times the optimum, then searched again with epsilon lowered by epsilon_step until it reaches 1 or
+        time_limit runs out. Each search reuses the best g of every state. States improved after they were
+        expanded wait in an inconsistent list and are the only ones the next search starts from, with the open
+        ones. Every solution is recorded in solutions as (cost, bound, elapsed time, moves), with the provable
+        bound cost / (lowest g + h on the open and inconsistent states). With anytime=False it is plain
+        weighted A*, which stops at the first solution. A budget passed to solve() replaces time_limit
+    """
+    def __init__(self, board, heuristic='manhattan', epsilon=2.5, epsilon_step=0.5, time_limit=None,
+                 anytime=True, on_solution=None):
+        super().__init__(board, heuristic, open_list='heap')
+        if epsilon < 1 or epsilon_step <= 0:
+            raise ValueError('epsilon must be at least 1 and epsilon_step positive')
+        self.epsilon = epsilon
+        self.epsilon_step = epsilon_step
+        self.time_limit = time_limit
+        self.anytime = anytime
+        self.on_solution = on_solution
+
+    def reset(self, board):
+        super().reset(board)
+        self.solutions = []
+        self.suboptimality_bound = None
+        self.searches = 0
+
+    def solve(self, budget=None):
+        if budget is None and self.time_limit is not None:
+            budget = SearchBudget(time_limit=self.time_limit)
+        self.budget = get_budget(budget)
+        self.s_time = time()
+        start = PuzzleState.from_board(self.initial_board, self.heuristic)
+        self.space = space = start.space
+        self.start_key = start.key
+        self.best_g = {start.key: 0}
+        self.parent_moves = {}
+        self.open_states = {start.key: (start.h, start.blank, start.aux)}
+        self.inconsistent = {}
+        self.peak_open = 1
+
+        epsilon = self.epsilon
+        cost = 'NOT_FOUND'
+        while True:
+            self.searches += 1
+            finished = self.improve_path(epsilon)
+            goal_g = self.best_g.get(space.goal_key)
+            # epsilon bounds the solution only once the search finished, g + h on the open states bounds it always
+            weight = epsilon if finished else float('inf')
+            if goal_g is not None:
+                # States on the goal's parent path may have been improved after the goal was last reached,
+                # so the path can be shorter than the goal's g. The cost is the path's own length
+                path = SolutionPath(space, start.key, str(SolutionPath.from_parent_moves(
+                    space, start.key, space.goal_key, self.parent_moves)))
+                if not self.solutions or len(path) < self.solutions[-1][0]:
+                    cost = len(path)
+                    self.record_solution(path, weight)
+                else:
+                    self.tighten_bound(cost, weight)
+            if not finished:
+                self.stop_reason, self.f_bound = self.budget.reason, self.lower_bound()
+            elif goal_g is not None:
+                self.f_bound = min(cost, self.lower_bound())
+            if not finished or goal_g is None or not self.anytime or self.suboptimality_bound <= 1:
+                return cost
+            epsilon = max(1, epsilon - self.epsilon_step)
+            self.open_states.update(self.inconsistent)
+            self.inconsistent = {}
+
+    def lower_bound(self):
+        """
+            Lowest g + h on the open and inconsistent states, the optimal cost is at least this
+        """
+        best_g = self.best_g
+        states = (self.open_states, self.inconsistent)
+        return min((best_g[key] + state[0] for states in states for key, state in states.items()),
+                   default=float('inf'))
+
+    def record_solution(self, path, weight):
+        cost = len(path)
+        self.suboptimality_bound = self.bound(cost, weight)
+        self.solution = path
+        moves = str(path)
+        self.solutions.append((cost, self.suboptimality_bound, round(time() - self.s_time, 6), moves))
+        if self.on_solution is not None:
+            self.on_solution(cost, self.suboptimality_bound, moves)
+
+    def bound(self, cost, weight):
+        return max(min(weight, cost / max(self.lower_bound(), 1)), 1.0)
+
+    def tighten_bound(self, cost, weight):
+        """
+            A later search that found no cheaper solution can still prove the last one closer to optimal
+        """
+        self.suboptimality_bound = min(self.suboptimality_bound, self.bound(cost, weight))
+        previous = self.solutions[-1]
+        self.solutions[-1] = (previous[0], self.suboptimality_bound, *previous[2:])
+
+    def improve_path(self, epsilon):
+        """
+            One weighted A* search from the open states, each state expanded at most once. Stops once no open
+            state is ordered before the goal's g. False if the budget ran out first
+        """
+        space = self.space
+        heuristic, moves, shifts, mask, goal_key = space.heuristic, space.moves, space.shifts, space.mask, space.goal_key
+        best_g, parent_moves = self.best_g, self.parent_moves
+        open_states, inconsistent = self.open_states, self.inconsistent
+        frontier = [(best_g[key] + epsilon * h, h, key) for key, (h, _, _) in open_states.items()]
+        heapq.heapify(frontier)
+        closed = set()
+        budget = self.budget
+
+        while frontier:
+            priority, h, key = frontier[0]
+            if key not in open_states or priority != best_g[key] + epsilon * h:
+                heapq.heappop(frontier)  # Expanded already, or pushed again with a better g
+                continue
+            if best_g.get(goal_key, float('inf')) <= priority:
+                return True
+            if self.nodes_expanded >= budget.next_check and budget.check(self.nodes_expanded):
+                return False
+
+            heapq.heappop(frontier)
+            _, blank, aux = open_states.pop(key)
+            self.history.visit(key)
+            closed.add(key)
+            next_g = best_g[key] + 1
+            for next_blank, move in moves[blank]:
+                shift = shifts[next_blank]
+                tile = (key >> shift) & mask
+                next_key = key - (tile << shift) + (tile << shifts[blank])
+                if best_g.get(next_key, next_g + 1) <= next_g:
+                    continue
+                best_g[next_key] = next_g
+                parent_moves[next_key] = move
+                next_h, next_aux = heuristic.update(h, aux, tile, next_blank, blank)
+                if next_key in closed:
+                    inconsistent[next_key] = (next_h, next_blank, next_aux)
+                else:
+                    open_states[next_key] = (next_h, next_blank, next_aux)
+                    heapq.heappush(frontier, (next_g + epsilon * next_h, next_h, next_key))
+                self.nodes_expanded += 1
+
+            if len(open_states) > self.peak_open:
+                self.peak_open = len(open_states)
+            self.peak_closed = max(self.peak_closed, len(best_g) - len(open_states))
+        return True
@@ -0,0 +1,137 @@
+from functools import partial
+from time import time
+
+from AStar import AStarSolver, ARAStarSolver
+from Bidirectional import BidirectionalSolver
+from Budget import SearchBudget
+from DistanceOracle import OracleSolver
+from Heuristics import default_goal
+from IDAstar import IDAStarSolver
+from Profiler import solver_results
+from PuzzleState import PuzzleState, flat_tiles, get_state_space
+from Saar.RBFS import RBFSSolver
+from SMAstar import SMAStarSolver
+
+SOLVERS = {
+    'astar': AStarSolver,
+    'idastar': IDAStarSolver,
+    'rbfs': RBFSSolver,
+    'bidirectional': BidirectionalSolver,
+    'smastar': SMAStarSolver,
+    'oracle': OracleSolver,
+    'arastar': ARAStarSolver,
+    'wastar': partial(ARAStarSolver, anytime=False)
+}
+
+
+def to_state(board, heuristic='manhattan', goal=None):
+    """
+        Boards are passed to the solvers as they are, flat or square tile sequences become PuzzleStates
+        of goal (zero first by default)
+    """
+    if not isinstance(board, (list, tuple)) and not hasattr(board, 'ravel'):
+        return board
+    tiles = flat_tiles(board)
+    dim = int(round(len(tiles) ** 0.5))
+    return PuzzleState.from_tiles(tiles, default_goal(dim) if goal is None else goal, heuristic)
+
+
+def warm_up(dim, heuristic='manhattan', goal=None):
+    """
+        Builds (or loads) the move tables, goal table and heuristic tables of one dimension and goal.
+        They are cached per process, so every later board of the same kind reuses them
+    """
+    get_state_space(dim, default_goal(dim) if goal is None else goal, heuristic)
+
+
+_worker_solver = None  # The solver a worker process of solve_many resets for each of its boards
+
+
+def _warm_worker(dim, heuristic, goal, solver, first, solver_kwargs):
+    global _worker_solver
+    warm_up(dim, heuristic, goal)
+    _worker_solver = SOLVERS[solver](to_state(first, heuristic, goal), heuristic, **solver_kwargs)
+
+
+def _solve_in_worker(board, **kwargs):
+    return solve_one(board, instance=_worker_solver, **kwargs)
+
+
+def solve_one(board, solver='idastar', heuristic='manhattan', goal=None, cache=None, budget=None, instance=None,
+              **solver_kwargs):
+    """
+        Result row of one board, with the moves of its solution. With a ResultCache, a board solved before
+        (or a symmetric image of it) is answered from the cache and new solutions are added to it.
+        budget is a Budget.SearchBudget every board is solved under, the default time limit without one.
+        The Saar solvers search without limits when they get no budget, so they are always given one here.
+        instance is an optional solver of a previous board, reset and reused instead of building a new one
+    """
+    state = to_state(board, heuristic, goal)
+    if cache is not None:
+        s_time = time()
+        cache_state = PuzzleState.from_board(state, heuristic)
+        cached = cache.get(cache_state)
+        if cached is not None:
+            actual_cost, moves = cached
+            return {
+                'experiment_name': f'{solver}_{heuristic}',
+                'actual_cost': actual_cost,
+                'elapsed_time': round(time() - s_time, 6),
+                'expanded_nodes': 0,
+                'count_steps': len(moves),
+                'cached': True,
+                'moves': moves
+            }
+
+    if instance is None:
+        instance = SOLVERS[solver](state, heuristic, **solver_kwargs)
+    else:
+        instance.reset(state)
+    s_time = time()
+    actual_cost = instance.solve(SearchBudget() if budget is None else budget)
+    e_time = time()
+    if actual_cost is None:  # RBFS exhausting an unsolvable board
+        actual_cost = 'NOT_FOUND'
+    res_dict = solver_results(instance, f'{solver}_{heuristic}', actual_cost, e_time - s_time)
+    res_dict['moves'] = str(instance.solution) if actual_cost != 'NOT_FOUND' else None
+    if cache is not None:
+        res_dict['cached'] = False
+        # Only optimal solutions are cached, a bounded-suboptimal one is not an answer for the other solvers
+        if actual_cost != 'NOT_FOUND' and (res_dict.get('suboptimality_bound') or 1) <= 1:
+            cache.put(cache_state, actual_cost, res_dict['moves'])
+    return res_dict
+
+
+def solve_many(boards, solver='idastar', heuristic='manhattan', goal=None, workers=None, chunksize=16, cache=None,
+               budget=None, **solver_kwargs):
+    """
+        Iterator of the result rows of boards, in order. The tables shared by the boards are set up once,
+        in this process or, with workers, once in every worker process of a pool the boards are sent to
+        in chunks. One solver is built per process and reset between its boards, so its history dict and
+        tables are reused. Boards are Board or PuzzleState objects or tile sequences of goal.
+        cache is an optional ResultCache.ResultCache, each worker opens its own connection to it
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver '{solver}'")
+    boards = iter(boards)
+    first = next(boards, None)
+    if first is None:
+        return
+    first_state = to_state(first, heuristic, goal)
+    space = PuzzleState.from_board(first_state, heuristic).space  # Warms this process up
+
+    if not workers:
+        solve = partial(solve_one, solver=solver, heuristic=heuristic, goal=goal, cache=cache, budget=budget,
+                        instance=SOLVERS[solver](first_state, heuristic, **solver_kwargs))
+        yield solve(first)
+        for board in boards:
+            yield solve(board)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    if cache is not None:
+        cache.setup()  # The workers only connect, they never race to create the table
+    solve = partial(_solve_in_worker, solver=solver, heuristic=heuristic, goal=goal, cache=cache, budget=budget)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker,
+                             initargs=(space.dim, heuristic, space.goal, solver, first, solver_kwargs)) as executor:
+        yield from executor.map(solve, [first, *boards], chunksize=chunksize)
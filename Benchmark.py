@@ -0,0 +1,211 @@
+import argparse
+import csv
+import json
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from time import time
+
+import numpy as np
+
+from AStar import AStarSolver
+from Bidirectional import BidirectionalSolver
+from IDAstar import IDAStarSolver
+from NPuzzle import Board
+from Profiler import solver_results
+from Results import BATCH_ROWS, columnar_format, iter_results, part_count, write_part
+from SMAstar import SMAStarSolver
+
+SOLVERS = {
+    'A': ('Astar', AStarSolver),
+    'AB': ('AstarBucket', partial(AStarSolver, open_list='bucket')),
+    'IDA': ('IDAstar', IDAStarSolver),
+    'MM': ('Bidirectional', BidirectionalSolver),
+    'SMA': ('SMAstar', SMAStarSolver)
+}
+HEURISTICS = ['manhattan', 'hamming', 'linear_conflict', 'walking_distance']
+JOB_TIME_LIMIT = 60*10
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise JobTimeout()
+
+
+def solve_with_time_limit(solver, time_limit=JOB_TIME_LIMIT):
+    """
+        (cost, elapsed seconds) of solver.solve(). The time limit is an interval timer whose signal
+        interrupts the search wherever it is, an interrupted search costs NOT_FOUND
+    """
+    timer = time_limit and hasattr(signal, 'setitimer')
+    if timer:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    s_time = time()
+    try:
+        actual_cost = solver.solve()
+    except JobTimeout:
+        actual_cost = 'NOT_FOUND'
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    e_time = time()
+    return actual_cost, e_time - s_time
+
+
+def run_job(seed, solver_key, heuristic, size=3, time_limit=JOB_TIME_LIMIT):
+    """
+        Solves the board of one seed in a worker process, the row of a job out of time is NOT_FOUND
+    """
+    np.random.seed(seed)
+    board = Board(size=size)
+    board.set_f(heuristic)
+    solver_name, solver_cls = SOLVERS[solver_key]
+    solver = solver_cls(board, heuristic)
+    actual_cost, elapsed_time = solve_with_time_limit(solver, time_limit)
+    return {'seed': seed, **solver_results(solver, f'{solver_name}_{heuristic}', actual_cost, elapsed_time)}
+
+
+class ResultsWriter:
+    """
+        Appends result rows to a CSV or, by the file extension, a JSONL file and flushes every row,
+        so a sweep that stops half way keeps everything it finished. A CSV row with columns the header lacks
+        (stop reasons, table or profiler stats) rewrites the file under the wider header. A .parquet or .arrow path is
+        a directory the rows are appended to in part files of batch_rows rows, a sweep that stops
+        loses the rows of its last, unwritten batch
+    """
+    def __init__(self, path, batch_rows=BATCH_ROWS):
+        self.path = path
+        self.is_jsonl = path.endswith('.jsonl')
+        self.is_columnar = columnar_format(path) is not None
+        self.batch_rows = batch_rows
+        self.fieldnames = None
+        self._file = None
+        self._writer = None
+        self._batch = []
+        self._parts = None
+
+    def finished_jobs(self):
+        """
+            (seed, experiment_name) of every row already in the file
+        """
+        if not os.path.exists(self.path):
+            return set()
+        if self.is_columnar:
+            return {(int(seed), experiment_name)
+                    for df in iter_results([self.path], columns=['seed', 'experiment_name'])
+                    for seed, experiment_name in zip(df['seed'], df['experiment_name'])}
+        with open(self.path, newline='') as f:
+            if self.is_jsonl:
+                rows = [json.loads(line) for line in f if line.strip()]
+            else:
+                reader = csv.DictReader(f)
+                self.fieldnames = reader.fieldnames
+                rows = list(reader)
+        return {(int(row['seed']), row['experiment_name']) for row in rows}
+
+    def write(self, row):
+        if self.is_columnar:
+            self._batch.append(row)
+            if len(self._batch) >= self.batch_rows:
+                self.flush()
+            return
+        if self._file is None:
+            is_new = not os.path.exists(self.path) or not os.path.getsize(self.path)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'a', newline='')
+            if not self.is_jsonl:
+                if self.fieldnames is None or is_new:
+                    self.fieldnames = list(row.keys())
+                self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+                if is_new:
+                    self._writer.writeheader()
+        if self.is_jsonl:
+            self._file.write(json.dumps(row, default=str) + '\n')
+        else:
+            new_fields = [key for key in row if key not in self.fieldnames]
+            if new_fields:
+                self.widen(new_fields)
+            self._writer.writerow(row)
+        self._file.flush()
+
+    def widen(self, new_fields):
+        """
+            Rewrites the CSV under its header extended with new_fields, the rows already in it leave them empty
+        """
+        self._file.close()
+        with open(self.path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.fieldnames = list(self.fieldnames) + new_fields
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+
+    def flush(self):
+        """
+            Writes the buffered rows of a columnar path as a new part file
+        """
+        if not self._batch:
+            return
+        if self._parts is None:
+            self._parts = part_count(self.path)
+        write_part(self.path, self._parts, self._batch)
+        self._parts += 1
+        self._batch = []
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def run_benchmark(seeds, output, solvers=tuple(SOLVERS), heuristics=tuple(HEURISTICS), size=3,
+                  workers=None, time_limit=JOB_TIME_LIMIT):
+    """
+        Spreads the (seed, solver, heuristic) jobs over a process pool and streams every row to output
+        as soon as its job completes. Jobs whose row is already in output are skipped
+    """
+    writer = ResultsWriter(output)
+    finished = writer.finished_jobs()
+    jobs = [(seed, solver_key, heuristic) for seed in seeds for solver_key in solvers for heuristic in heuristics
+            if (seed, f'{SOLVERS[solver_key][0]}_{heuristic}') not in finished]
+    print(f'{len(jobs)} jobs to run, {len(finished)} already finished in {output}')
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_job, seed, solver_key, heuristic, size, time_limit):
+                       (seed, solver_key, heuristic) for seed, solver_key, heuristic in jobs}
+            for done, future in enumerate(as_completed(futures), 1):
+                row = future.result()
+                writer.write(row)
+                print(f"[{done}/{len(jobs)}] seed {row['seed']} {row['experiment_name']}: "
+                      f"cost = {row['actual_cost']}, {row['elapsed_time']} sec")
+    finally:
+        writer.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve a sweep of seeded boards on a process pool')
+    parser.add_argument('--seeds', type=int, nargs=2, default=(1, 101), metavar=('FIRST', 'STOP'))
+    parser.add_argument('--output', default=os.path.join('outputs', 'all_res.csv'),
+                        help='.csv or .jsonl file the rows are appended to')
+    parser.add_argument('--solvers', nargs='+', default=list(SOLVERS), choices=list(SOLVERS))
+    parser.add_argument('--heuristics', nargs='+', default=HEURISTICS)
+    parser.add_argument('--size', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=None, help='defaults to the number of cores')
+    parser.add_argument('--time-limit', type=float, default=JOB_TIME_LIMIT, help='seconds per job, 0 for none')
+    args = parser.parse_args()
+    run_benchmark(range(*args.seeds), args.output, args.solvers, args.heuristics, args.size,
+                  args.workers, args.time_limit)
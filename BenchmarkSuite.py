@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+import platform
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from statistics import median
+
+import numpy as np
+
+from Benchmark import SOLVERS, ResultsWriter, solve_with_time_limit, solver_results
+from Heuristics import default_goal
+from Instances import random_instances
+from NPuzzle import Board
+from PuzzleState import get_state_space
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, peak memory is then not reported
+    resource = None
+
+SUITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+BASELINE_PATH = os.path.join(SUITE_DIR, 'baseline.json')
+SUITE_SEED = 2023
+KORF_COUNT = 100
+EIGHT_PUZZLE_DEPTHS = (8, 12, 16, 20, 24, 28)
+EIGHT_PUZZLE_SET_SIZE = 10
+SUITE_TIME_LIMIT = 60
+TOLERANCE = 0.1
+# Summary metric: True if a higher value is a regression
+METRICS = {
+    'median_time': True,
+    'median_expanded_nodes': True,
+    'nodes_per_sec': False,
+    'peak_memory_kb': True
+}
+
+
+def write_instances(path, boards, costs=None, description=''):
+    """
+        One board per line: its index, its optimal cost ('-' if unknown) and its tiles
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        if description:
+            f.write(f'# {description}\n')
+        for index, tiles in enumerate(boards):
+            cost = '-' if costs is None else costs[index]
+            f.write(f"{index} {cost} {' '.join(str(int(tile)) for tile in tiles)}\n")
+
+
+def load_instances(path):
+    """
+        (index, optimal cost or None, tiles) of every board of an instance file
+    """
+    instances = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            index, cost, *tiles = line.split()
+            instances.append((int(index), None if cost == '-' else int(cost), tuple(int(tile) for tile in tiles)))
+    return instances
+
+
+def instance_sets(directory=SUITE_DIR):
+    """
+        Name of every instance file of the suite
+    """
+    return sorted(name[:-len('.txt')] for name in os.listdir(directory) if name.endswith('.txt'))
+
+
+def goal_distances(dim=3, goal=None):
+    """
+        Optimal cost of every state reachable from the goal, by breadth first search over packed keys.
+        Meant for the 8-puzzle, the 15-puzzle does not fit in memory
+    """
+    space = get_state_space(dim, default_goal(dim) if goal is None else goal)
+    start = (space.goal_key, space.goal.index(0))
+    distances = {start[0]: 0}
+    layer = [start]
+    depth = 0
+    while layer:
+        depth += 1
+        next_layer = []
+        for key, blank in layer:
+            for next_blank, _ in space.moves[blank]:
+                next_key = space.move_key(key, blank, next_blank)
+                if next_key not in distances:
+                    distances[next_key] = depth
+                    next_layer.append((next_key, next_blank))
+        layer = next_layer
+    return space, distances
+
+
+def make_instance_sets(directory=SUITE_DIR, seed=SUITE_SEED, korf_count=KORF_COUNT, depths=EIGHT_PUZZLE_DEPTHS,
+                       set_size=EIGHT_PUZZLE_SET_SIZE):
+    """
+        Writes the fixed instance files: korf_count uniformly random solvable 15-puzzles, in the style of
+        Korf's 100, and for every depth set_size 8-puzzles drawn uniformly among the states of that optimal cost
+    """
+    boards = random_instances(korf_count, dim=4, seed=seed)
+    write_instances(os.path.join(directory, 'korf100_15puzzle.txt'), boards,
+                    description=f'{korf_count} random solvable 15-puzzles, seed {seed}')
+
+    space, distances = goal_distances(3)
+    by_depth = {}
+    for key, depth in distances.items():
+        by_depth.setdefault(depth, []).append(key)
+    for depth in depths:
+        keys = sorted(by_depth[depth])
+        picked = np.random.default_rng([seed, depth]).choice(len(keys), size=set_size, replace=False)
+        write_instances(os.path.join(directory, f'8puzzle_depth_{depth:02d}.txt'),
+                        [space.unpack(keys[i]) for i in sorted(picked)], [depth] * set_size,
+                        description=f'{set_size} 8-puzzles of optimal cost {depth}, seed {seed}')
+
+
+def run_instance(instance_set, index, optimal_cost, tiles, solver_key, heuristic, time_limit=SUITE_TIME_LIMIT):
+    """
+        Result row of one board, solved in a process of its own so its peak RSS is the solver's
+    """
+    board = Board(size=int(round(len(tiles) ** 0.5)), tiles=tiles)
+    board.set_f(heuristic)
+    solver_name, solver_cls = SOLVERS[solver_key]
+    solver = solver_cls(board, heuristic)
+    actual_cost, elapsed_time = solve_with_time_limit(solver, time_limit)
+    res_dict = solver_results(solver, f'{solver_name}_{heuristic}', actual_cost, elapsed_time)
+    res_dict['nodes_per_sec'] = round(solver.nodes_expanded / elapsed_time) if elapsed_time else None
+    if resource is not None:
+        res_dict['peak_memory_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {'instance_set': instance_set, 'instance': index, 'optimal_cost': optimal_cost, **res_dict}
+
+
+def run_suite(sets=None, solvers=('A', 'IDA'), heuristics=('manhattan',), workers=None, time_limit=SUITE_TIME_LIMIT,
+              output=None, directory=SUITE_DIR):
+    """
+        Solves every board of the instance sets (all of them by default) with every solver and heuristic.
+        Every job runs in a fresh worker process. Rows are streamed to output if given and returned
+    """
+    jobs = [(name, index, cost, tiles, solver_key, heuristic)
+            for name in (sets or instance_sets(directory))
+            for index, cost, tiles in load_instances(os.path.join(directory, f'{name}.txt'))
+            for solver_key in solvers for heuristic in heuristics]
+    writer = ResultsWriter(output) if output else None
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as executor:
+            futures = [executor.submit(run_instance, *job, time_limit) for job in jobs]
+            for done, future in enumerate(as_completed(futures), 1):
+                row = future.result()
+                rows.append(row)
+                if writer is not None:
+                    writer.write(row)
+                print(f"[{done}/{len(jobs)}] {row['instance_set']} #{row['instance']} {row['experiment_name']}: "
+                      f"cost = {row['actual_cost']}, {row['elapsed_time']} sec")
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def summarize(rows):
+    """
+        Per instance set and experiment: instances, solved, wrong costs, median time and expanded nodes
+        of the solved boards, overall nodes/sec and the highest peak memory
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault(f"{row['instance_set']}/{row['experiment_name']}", []).append(row)
+    summary = {}
+    for name, group in sorted(groups.items()):
+        solved = [row for row in group if row['actual_cost'] != 'NOT_FOUND']
+        total_time = sum(row['elapsed_time'] for row in group)
+        memory = [row['peak_memory_kb'] for row in group if row.get('peak_memory_kb') is not None]
+        summary[name] = {
+            'instances': len(group),
+            'solved': len(solved),
+            'wrong_cost': sum(1 for row in solved
+                              if row['optimal_cost'] is not None and int(row['actual_cost']) != row['optimal_cost']),
+            'median_time': round(median(row['elapsed_time'] for row in solved), 6) if solved else None,
+            'median_expanded_nodes': median(row['expanded_nodes'] for row in solved) if solved else None,
+            'nodes_per_sec': round(sum(row['expanded_nodes'] for row in group) / total_time) if total_time else None,
+            'peak_memory_kb': max(memory) if memory else None
+        }
+    return summary
+
+
+def save_baseline(summary, path=BASELINE_PATH):
+    with open(path, 'w') as f:
+        json.dump({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': summary
+        }, f, indent=2, sort_keys=True)
+
+
+def compare(summary, baseline, tolerance=TOLERANCE):
+    """
+        Regressions of a summary against a baseline one: fewer boards solved, any wrong cost, or a metric
+        worse than the baseline's by more than the tolerance (a fraction of the baseline value)
+    """
+    regressions = []
+    for name, stats in summary.items():
+        if stats['wrong_cost']:
+            regressions.append(f"{name}: {stats['wrong_cost']} boards solved with a non optimal cost")
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if stats['solved'] < base['solved']:
+            regressions.append(f"{name}: solved {stats['solved']} boards, baseline {base['solved']}")
+        for metric, higher_is_worse in METRICS.items():
+            value, base_value = stats.get(metric), base.get(metric)
+            if value is None or not base_value:
+                continue
+            change = (value - base_value) / base_value
+            if (change if higher_is_worse else -change) > tolerance:
+                regressions.append(f'{name}: {metric} {value} vs baseline {base_value} ({change:+.1%})')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the fixed instance sets and compare them with a baseline')
+    parser.add_argument('--generate', action='store_true', help='(re)write the instance files and exit')
+    parser.add_argument('--sets', nargs='+', default=None, help='instance set names, defaults to all of them')
+    parser.add_argument('--solvers', nargs='+', default=['A', 'IDA'], choices=list(SOLVERS))
+    parser.add_argument('--heuristics', nargs='+', default=['manhattan'])
+    parser.add_argument('--workers', type=int, default=None, help='defaults to the number of cores')
+    parser.add_argument('--time-limit', type=float, default=SUITE_TIME_LIMIT, help='seconds per board, 0 for none')
+    parser.add_argument('--output', default=None, help='.csv or .jsonl file the rows are appended to')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    if args.generate:
+        make_instance_sets()
+        sys.exit(0)
+
+    summary = summarize(run_suite(args.sets, args.solvers, args.heuristics, args.workers, args.time_limit,
+                                  args.output))
+    for name, stats in summary.items():
+        print(name, stats)
+    if args.save_baseline:
+        save_baseline(summary, args.baseline)
+        print(f'Baseline saved to {args.baseline}')
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(summary, json.load(f)['results'], args.tolerance)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        print(f'{len(regressions)} regressions beyond {args.tolerance:.0%} of {args.baseline}')
+        sys.exit(1 if regressions else 0)
+    else:
+        # Times and memory depend on the machine, so no baseline is committed: each machine saves its own
+        print(f'No baseline at {args.baseline}, the regression check is skipped. '
+              f'Run with --save-baseline to store this run as one')
@@ -0,0 +1,138 @@
+import heapq
+
+from Budget import get_budget
+from Heuristics import GOAL_INDEPENDENT, make_heuristic
+from Profiler import VisitHistory
+from PuzzleState import PuzzleState, SolutionPath, StateSpace
+
+
+class SearchDirection:
+    """
+        One side of the bidirectional search: the best g and parent of every state it reached and its open list
+        of (priority, g, key, blank, h, aux). The heuristic of the backward side estimates the distance to the start
+    """
+    def __init__(self, start):
+        self.space = start.space
+        self.g = {start.key: 0}
+        self.parent = {start.key: None}
+        self.open = [(start.h, 0, start.key, start.blank, start.h, start.aux)]
+        self.closed = set()
+
+    def min_priority(self):
+        """
+            Lowest priority in the open list, entries superseded by a better g are dropped on the way
+        """
+        open_list = self.open
+        while open_list and open_list[0][1] > self.g[open_list[0][2]]:
+            heapq.heappop(open_list)
+        return open_list[0][0] if open_list else float('inf')
+
+    def path_to(self, key):
+        """
+            Keys from this side's start to key
+        """
+        path = []
+        while key is not None:
+            path.append(key)
+            key = self.parent[key]
+        return path[::-1]
+
+
+class BidirectionalSolver:
+    """
+        MM: meets in the middle by expanding, from the start or from the goal, the state of the lowest
+        priority max(f, 2g). Every state generated by both sides gives a path whose cost U bounds the
+        optimum from above, and the lowest priority of both open lists bounds it from below.
+        The backward side aims at the start, a layout of its own for every board: it uses the heuristic if it is
+        goal independent and manhattan otherwise, and its tables are built for this search only
+    """
+    def __init__(self, board, heuristic='manhattan'):
+        self.heuristic = heuristic
+        self.history = VisitHistory()
+        self.reset(board)
+
+    def reset(self, board):
+        """
+            Sets the solver up to solve another board, with the same heuristic and history dict
+        """
+        self.solution = []
+        self.initial_board = board
+        self.nodes_expanded = 1
+        self.history.clear()
+        self.peak_open = 0
+        self.peak_closed = 0
+        self.stop_reason = None
+        self.f_bound = None
+
+    def backward_start(self, start):
+        space = start.space
+        name = self.heuristic if self.heuristic in GOAL_INDEPENDENT else 'manhattan'
+        backward_space = StateSpace(space.dim, start.tiles, make_heuristic(name, space.dim, start.tiles))
+        h, aux = backward_space.heuristic.evaluate(space.goal)
+        return PuzzleState(backward_space, space.goal_key, list(space.goal).index(0), 0, h, aux)
+
+    def solve(self, budget=None):
+        """
+            Out of budget (the default time limit without one), the search stops with NOT_FOUND, stop_reason
+            and f_bound: the lowest priority of both open lists, which the optimal cost is at least
+        """
+        budget = get_budget(budget)
+        start = PuzzleState.from_board(self.initial_board, self.heuristic)
+        space = start.space
+        if start.key == space.goal_key:
+            self.solution = SolutionPath(space, start.key, '')
+            return 0
+        goal = self.backward_start(start)
+        forward, backward = SearchDirection(start), SearchDirection(goal)
+        moves, shifts, mask = space.moves, space.shifts, space.mask
+
+        best_cost = float('inf')
+        meet = None
+        self.peak_open = 2
+        while forward.open and backward.open:
+            forward_priority, backward_priority = forward.min_priority(), backward.min_priority()
+            if best_cost <= min(forward_priority, backward_priority):
+                break
+            if forward_priority <= backward_priority:
+                direction, other = forward, backward
+            else:
+                direction, other = backward, forward
+
+            if self.nodes_expanded >= budget.next_check and budget.check(self.nodes_expanded):
+                self.stop_reason = budget.reason
+                self.f_bound = min(forward_priority, backward_priority, best_cost)
+                return 'NOT_FOUND'
+
+            _, g, key, blank, h, aux = heapq.heappop(direction.open)
+            self.history.visit(key)
+            direction.closed.add(key)
+
+            heuristic = direction.space.heuristic
+            next_g = g + 1
+            for next_blank, _ in moves[blank]:
+                shift = shifts[next_blank]
+                tile = (key >> shift) & mask
+                next_key = key - (tile << shift) + (tile << shifts[blank])
+                if direction.g.get(next_key, next_g + 1) <= next_g:
+                    continue
+                direction.g[next_key] = next_g
+                direction.parent[next_key] = key
+                next_h, next_aux = heuristic.update(h, aux, tile, next_blank, blank)
+                heapq.heappush(direction.open, (max(next_g + next_h, 2 * next_g), next_g, next_key, next_blank,
+                                                next_h, next_aux))
+                self.nodes_expanded += 1
+
+                other_g = other.g.get(next_key)
+                if other_g is not None and next_g + other_g < best_cost:
+                    best_cost = next_g + other_g
+                    meet = next_key
+
+            if len(forward.open) + len(backward.open) > self.peak_open:
+                self.peak_open = len(forward.open) + len(backward.open)
+            self.peak_closed = len(forward.closed) + len(backward.closed)
+
+        if meet is None:
+            return 'NOT_FOUND'
+        self.solution = SolutionPath.from_keys(space, forward.path_to(meet) + backward.path_to(meet)[-2::-1])
+        self.f_bound = best_cost
+        return best_cost
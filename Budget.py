@@ -0,0 +1,116 @@
+import os
+from time import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, the memory limit then reads /proc only
+    resource = None
+
+DEFAULT_TIME_LIMIT = 60*10
+CHECK_INTERVAL = 1 << 10  # Nodes generated between two looks at the clock, the memory and the token
+STOP_REASONS = ('time', 'nodes', 'memory', 'cancelled')
+
+
+def resident_memory_kb():
+    """
+        Current resident size of this process, or its peak where /proc is not available
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class CancellationToken:
+    """
+        Stops the searches it is given once cancel() is called, from another thread or a signal handler.
+        Any object with is_set(), such as a threading or multiprocessing Event, works as a token too
+    """
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def is_set(self):
+        return self.cancelled
+
+
+class SearchBudget:
+    """
+        Limits of one search: time_limit seconds of wall clock, max_nodes generated, max_memory_kb of resident
+        memory and a cancellation token, each optional. Solvers test `nodes >= budget.next_check` inline and
+        call check(nodes) only then, so the clock, the memory and the token are looked at every
+        check_interval nodes. The node limit is tested at the same points, not per generated node, so a search
+        can stop past max_nodes: by the rest of one expansion's children in the iterative solvers, and by a few
+        dozen nodes in the recursive ones (in_place=False), which count a child once its subtree has returned.
+        Once a limit is hit, reason names it. until is an absolute time() the search stops at whenever it starts,
+        such as the deadline of the search that handed this one out
+    """
+    def __init__(self, time_limit=DEFAULT_TIME_LIMIT, max_nodes=None, max_memory_kb=None, token=None,
+                 check_interval=CHECK_INTERVAL, until=None):
+        self.time_limit = time_limit
+        self.until = until
+        self.max_nodes = max_nodes
+        self.max_memory_kb = max_memory_kb
+        self.token = token
+        self.check_interval = check_interval
+        self.deadline = None
+        self.next_check = 0
+        self.reason = None
+
+    def start(self, nodes=0):
+        """
+            Starts the clock, budgets are reusable and every solve() starts its own
+        """
+        self.deadline = None if self.time_limit is None else time() + self.time_limit
+        if self.until is not None and (self.deadline is None or self.until < self.deadline):
+            self.deadline = self.until
+        self.reason = None
+        self.schedule(nodes)
+        return self
+
+    def schedule(self, nodes):
+        self.next_check = nodes + self.check_interval
+        if self.max_nodes is not None and self.max_nodes < self.next_check:
+            self.next_check = self.max_nodes
+
+    def check(self, nodes):
+        """
+            True once the search should stop, the next check is scheduled otherwise
+        """
+        if self.reason is not None:
+            return True
+        if self.max_nodes is not None and nodes >= self.max_nodes:
+            self.reason = 'nodes'
+        elif self.token is not None and self.token.is_set():
+            self.reason = 'cancelled'
+        elif self.deadline is not None and time() >= self.deadline:
+            self.reason = 'time'
+        elif self.max_memory_kb is not None and (resident_memory_kb() or 0) > self.max_memory_kb:
+            self.reason = 'memory'
+        else:
+            self.schedule(nodes)
+            return False
+        return True
+
+    @property
+    def remaining(self):
+        """
+            Seconds left before the deadline, None without a time limit
+        """
+        return None if self.deadline is None else max(self.deadline - time(), 0)
+
+    @property
+    def exhausted(self):
+        return self.reason is not None
+
+
+def get_budget(budget):
+    """
+        The budget a solve() runs under: the given one, or the default time limit, started
+    """
+    return (SearchBudget() if budget is None else budget).start()
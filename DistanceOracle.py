@@ -0,0 +1,170 @@
+import sys
+
+from Heuristics import get_heuristic
+from PatternDB import PDB_DIR, UNKNOWN, PatternDatabase, count_permutations, rank
+from PuzzleState import PuzzleState
+
+MAX_DIM = 3  # 16!/2 bytes would not fit in memory
+
+
+class DistanceOracle(PatternDatabase):
+    """
+        Exact distance to the goal of every reachable state, one byte per state: a pattern database of every
+        tile (the blank too) but the last two tiles in goal order. The cells of those two are fixed by the
+        others, as swapping them makes a board unsolvable, so the states are ranked densely: 9!/2 = 181,440
+        bytes for the 8-puzzle, mapped from disk. Also a perfect heuristic, whose aux packs the cell of every tile
+    """
+    def __init__(self, table, directory=PDB_DIR):
+        if table.dim > MAX_DIM:
+            raise ValueError(f'The distance oracle is defined for boards up to {MAX_DIM}x{MAX_DIM} only')
+        super().__init__(table, [tile for tile in table.goal if tile][:-2] + [0], directory)
+        dim = table.dim
+        self.moves = []
+        for blank in range(table.size):
+            row, col = divmod(blank, dim)
+            self.moves.append([(blank + step, move) for move, step, valid in
+                               (('U', -dim, row > 0), ('D', dim, row < dim - 1),
+                                ('L', -1, col > 0), ('R', 1, col < dim - 1)) if valid])
+        self.load_or_build()
+
+    def file_name(self):
+        goal = ''.join(f'{tile:x}' for tile in self.table.goal)
+        return f'oracle_{self.table.dim}_{goal}.bin'
+
+    def index(self, tiles):
+        cells = [0] * self.n_cells
+        for cell, tile in enumerate(tiles):
+            cells[tile] = cell
+        return rank([cells[tile] for tile in self.tiles], self.n_cells)
+
+    def is_solvable(self, tiles):
+        """
+            The board with the last two tiles swapped has the same index, only one of the two reaches the goal:
+            the one whose permutation of the goal cells has the parity of the blank's distance from its goal cell
+        """
+        return self.table.is_solvable(tiles)
+
+    def build(self):
+        """
+            Breadth first search from the goal over whole boards, each layer one move further
+        """
+        data = bytearray([UNKNOWN]) * count_permutations(self.n_cells, len(self.tiles))
+        goal = self.table.goal
+        data[self.index(goal)] = 0
+        layer = [goal]
+        depth = 0
+        while layer:
+            depth += 1
+            next_layer = []
+            for tiles in layer:
+                blank = tiles.index(0)
+                for next_blank, _ in self.moves[blank]:
+                    next_tiles = list(tiles)
+                    next_tiles[blank], next_tiles[next_blank] = tiles[next_blank], 0
+                    index = self.index(next_tiles)
+                    if data[index] == UNKNOWN:
+                        data[index] = depth
+                        next_layer.append(tuple(next_tiles))
+            layer = next_layer
+        return data
+
+    def evaluate(self, tiles):
+        positions = 0
+        for cell, tile in enumerate(tiles):
+            positions |= cell << (int(tile) * self.bits)
+        return self.value(positions), positions
+
+    def update(self, h, aux, tile, src, dst):
+        positions = aux + ((dst - src) << (tile * self.bits)) + (src - dst)
+        return self.value(positions), positions
+
+    def distance(self, tiles):
+        """
+            Optimal cost of a flat tiles sequence, None if the goal cannot be reached from it
+        """
+        tiles = [int(tile) for tile in tiles]
+        if not self.is_solvable(tiles):
+            return None
+        return self.evaluate(tiles)[0]
+
+    def solve(self, tiles):
+        """
+            Optimal blank moves from tiles to the goal, each move to a neighbour one step closer.
+            None if the goal cannot be reached
+        """
+        tiles = [int(tile) for tile in tiles]
+        if not self.is_solvable(tiles):
+            return None
+        h, positions = self.evaluate(tiles)
+        blank = tiles.index(0)
+        moves = []
+        while h:
+            for next_blank, move in self.moves[blank]:
+                tile = tiles[next_blank]
+                next_h, next_positions = self.update(h, positions, tile, next_blank, blank)
+                if next_h == h - 1:
+                    break
+            tiles[blank], tiles[next_blank] = tile, 0
+            h, positions, blank = next_h, next_positions, next_blank
+            moves.append(move)
+        return ''.join(moves)
+
+
+def get_oracle(goal=None, dim=3):
+    return get_heuristic('oracle', dim, goal)
+
+
+def validate(board, cost, moves=None):
+    """
+        True if cost is the optimal cost of the board (an NPuzzle, Saar or PuzzleState board) and moves,
+        if given, are legal blank moves of that length reaching the goal
+    """
+    state = PuzzleState.from_board(board)
+    space = state.space
+    oracle = get_oracle(space.goal, space.dim)
+    if oracle.distance(state.tiles) != cost:
+        return False
+    if moves is None:
+        return True
+    moves = str(moves)
+    key, blank = state.key, state.blank
+    for move in moves:
+        next_blank = blank + space.move_steps[move]
+        if (next_blank, move) not in space.moves[blank]:
+            return False
+        key = space.move_key(key, blank, next_blank)
+        blank = next_blank
+    return len(moves) == cost and key == space.goal_key
+
+
+class OracleSolver:
+    """
+        Answers a 3x3 board from the distance oracle, in the solvers' interface
+    """
+    def __init__(self, board, heuristic='manhattan'):
+        self.heuristic = heuristic
+        self.history = {}
+        self.reset(board)
+
+    def reset(self, board):
+        self.solution = []
+        self.initial_board = board
+        self.nodes_expanded = 1
+
+    def solve(self, budget=None):
+        # A lookup and a descent of at most 31 moves, no budget can run out during it
+        state = PuzzleState.from_board(self.initial_board)
+        moves = get_oracle(state.space.goal, state.space.dim).solve(state.tiles)
+        if moves is None:
+            return 'NOT_FOUND'
+        self.solution = moves
+        self.nodes_expanded = len(moves) + 1
+        return len(moves)
+
+
+if __name__ == '__main__':
+    oracle = get_oracle()
+    print(f'{oracle.path} is ready, {len(oracle.data)} states')
+    if len(sys.argv) > 1:
+        tiles = [int(tile) for tile in ' '.join(sys.argv[1:]).replace(',', ' ').split()]
+        print(oracle.distance(tiles), oracle.solve(tiles))
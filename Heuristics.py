@@ -0,0 +1,312 @@
+from collections import deque
+from functools import partial
+
+from PatternDB import PATTERNS, AdditivePDB
+
+
+def default_goal(dim):
+    """
+        The goal layout generated by NPuzzle.Board, zero comes first
+    """
+    return tuple(range(dim * dim))
+
+
+def zero_last_goal(dim):
+    """
+        The goal layout used by Saar/NPuzzle.Board, zero comes last
+    """
+    return tuple(range(1, dim * dim)) + (0,)
+
+
+class GoalTable:
+    """
+        Goal cell of every tile and the manhattan distance of every tile from every cell.
+        Built once per board dimension and goal layout and shared by all the boards using it
+    """
+    def __init__(self, dim, goal):
+        self.dim = dim
+        self.size = dim * dim
+        self.goal = tuple(int(tile) for tile in goal)
+
+        self.goal_cell = [0] * self.size
+        for cell, tile in enumerate(self.goal):
+            self.goal_cell[tile] = cell
+        self.goal_pos = [divmod(cell, dim) for cell in self.goal_cell]
+
+        cells = [divmod(cell, dim) for cell in range(self.size)]
+        self.manhattan = [
+            [0 if tile == 0 else abs(row - goal_row) + abs(col - goal_col) for row, col in cells]
+            for tile, (goal_row, goal_col) in enumerate(self.goal_pos)
+        ]
+
+    def is_solvable(self, tiles):
+        """
+            A board reaches the goal iff the permutation taking its cells to the goal cells has the parity
+            of the blank's manhattan distance from its goal cell
+        """
+        perm = [self.goal_cell[tile] for tile in tiles]
+        parity = 0
+        for i in range(len(perm)):
+            while perm[i] != i:
+                j = perm[i]
+                perm[i], perm[j] = perm[j], j
+                parity ^= 1
+        blank, goal_blank = divmod(list(tiles).index(0), self.dim), self.goal_pos[0]
+        return parity == (abs(blank[0] - goal_blank[0]) + abs(blank[1] - goal_blank[1])) % 2
+
+
+_goal_tables = {}
+
+
+def get_goal_table(dim, goal=None):
+    goal = default_goal(dim) if goal is None else tuple(int(tile) for tile in goal)
+    key = (dim, goal)
+    if key not in _goal_tables:
+        _goal_tables[key] = GoalTable(dim, goal)
+    return _goal_tables[key]
+
+
+class Manhattan:
+    """
+        Sum of the manhattan distances of the non-zero tiles from their goal cells
+    """
+    name = 'manhattan'
+
+    def __init__(self, table):
+        self.table = table
+        self.distance = table.manhattan
+
+    def evaluate(self, tiles):
+        distance = self.distance
+        return sum(distance[tile][cell] for cell, tile in enumerate(tiles)), None
+
+    def update(self, h, aux, tile, src, dst):
+        distance = self.distance[tile]
+        return h - distance[src] + distance[dst], aux
+
+
+class Hamming:
+    """
+        Number of non-zero tiles out of their goal cells
+    """
+    name = 'hamming'
+
+    def __init__(self, table):
+        self.table = table
+        self.goal_cell = table.goal_cell
+
+    def evaluate(self, tiles):
+        goal_cell = self.goal_cell
+        return sum(1 for cell, tile in enumerate(tiles) if tile != 0 and goal_cell[tile] != cell), None
+
+    def update(self, h, aux, tile, src, dst):
+        goal = self.goal_cell[tile]
+        if goal == src:  # The move took the tile FROM its goal cell
+            return h + 1, aux
+        if goal == dst:  # The move took the tile TO its goal cell
+            return h - 1, aux
+        return h, aux
+
+
+def _longest_increasing(values):
+    tails = []
+    for value in values:
+        i = 0
+        while i < len(tails) and tails[i] < value:
+            i += 1
+        if i == len(tails):
+            tails.append(value)
+        else:
+            tails[i] = value
+    return len(tails)
+
+
+class LinearConflict:
+    """
+        Manhattan plus 2 moves for every tile that has to leave its goal line to let the others pass it.
+        Each row and column is coded by the goal position of the tiles that belong to it (dim for the
+        other tiles), aux packs the codes of all the lines so a move only re-reads the lines it touches
+    """
+    name = 'linear_conflict'
+
+    def __init__(self, table):
+        self.table = table
+        self.distance = table.manhattan
+        dim = table.dim
+        base = dim + 1
+        self.line_bits = (base ** dim - 1).bit_length()
+        self.line_mask = (1 << self.line_bits) - 1
+
+        # conflicts[code] is the number of tiles to remove from a line so the rest are in goal order
+        self.conflicts = []
+        for code in range(base ** dim):
+            goal_positions = []
+            for _ in range(dim):
+                code, digit = divmod(code, base)
+                if digit != dim:
+                    goal_positions.append(digit)
+            self.conflicts.append(len(goal_positions) - _longest_increasing(goal_positions))
+
+        # Rows are lines 0..dim-1 and columns are lines dim..2*dim-1.
+        # row_code[tile][cell] is what the tile adds to its row code at that cell compared with the blank
+        self.lines = [(row, dim + col) for row, col in (divmod(cell, dim) for cell in range(table.size))]
+        self.row_code = [[0] * table.size for _ in range(table.size)]
+        self.col_code = [[0] * table.size for _ in range(table.size)]
+        for tile in range(1, table.size):
+            goal_row, goal_col = table.goal_pos[tile]
+            for cell in range(table.size):
+                row, col = divmod(cell, dim)
+                if row == goal_row:
+                    self.row_code[tile][cell] = (goal_col - dim) * base ** col
+                if col == goal_col:
+                    self.col_code[tile][cell] = (goal_row - dim) * base ** row
+
+    def evaluate(self, tiles):
+        dim = self.table.dim
+        blank_code = sum(dim * (dim + 1) ** i for i in range(dim))
+        codes = [blank_code] * (2 * dim)
+        h = 0
+        for cell, tile in enumerate(tiles):
+            row_line, col_line = self.lines[cell]
+            codes[row_line] += self.row_code[tile][cell]
+            codes[col_line] += self.col_code[tile][cell]
+            h += self.distance[tile][cell]
+        aux = 0
+        for line, code in enumerate(codes):
+            h += 2 * self.conflicts[code]
+            aux |= code << (line * self.line_bits)
+        return h, aux
+
+    def update(self, h, aux, tile, src, dst):
+        distance = self.distance[tile]
+        h += distance[dst] - distance[src]
+        src_row, src_col = self.lines[src]
+        dst_row, dst_col = self.lines[dst]
+        for line, delta in ((src_row, -self.row_code[tile][src]), (dst_row, self.row_code[tile][dst]),
+                            (src_col, -self.col_code[tile][src]), (dst_col, self.col_code[tile][dst])):
+            if delta:
+                shift = line * self.line_bits
+                code = (aux >> shift) & self.line_mask
+                h += 2 * (self.conflicts[code + delta] - self.conflicts[code])
+                aux += delta << shift
+        return h, aux
+
+
+_walking_distance_tables = {}
+
+
+def walking_distance_table(dim, blank_line):
+    """
+        Distance from the goal of every (line, goal line) tile count matrix, moving one tile
+        at a time between the blank's line and a neighbouring line.
+        Count matrices are coded with dim.bit_length() bits per entry
+    """
+    key = (dim, blank_line)
+    if key in _walking_distance_tables:
+        return _walking_distance_tables[key]
+
+    count_bits = dim.bit_length()
+    count_mask = (1 << count_bits) - 1
+
+    def unit(line, goal_line):
+        return 1 << ((line * dim + goal_line) * count_bits)
+
+    goal = sum(unit(line, line) * (dim - (line == blank_line)) for line in range(dim))
+    distances = {goal: 0}
+    queue = deque([(goal, blank_line)])
+    while queue:
+        code, blank = queue.popleft()
+        distance = distances[code] + 1
+        for line in (blank - 1, blank + 1):
+            if 0 <= line < dim:
+                for goal_line in range(dim):
+                    if (code >> ((line * dim + goal_line) * count_bits)) & count_mask:
+                        next_code = code - unit(line, goal_line) + unit(blank, goal_line)
+                        if next_code not in distances:
+                            distances[next_code] = distance
+                            queue.append((next_code, line))
+    _walking_distance_tables[key] = distances
+    return distances
+
+
+class WalkingDistance:
+    """
+        Sum of the vertical and horizontal walking distances. aux packs the (row, goal row)
+        count matrix and, above it, the (column, goal column) count matrix
+    """
+    name = 'walking_distance'
+
+    def __init__(self, table):
+        self.table = table
+        dim = table.dim
+        count_bits = dim.bit_length()
+        blank_row, blank_col = table.goal_pos[0]
+        self.vertical = walking_distance_table(dim, blank_row)
+        self.horizontal = walking_distance_table(dim, blank_col)
+        self.vertical_bits = dim * dim * count_bits
+        self.vertical_mask = (1 << self.vertical_bits) - 1
+
+        # unit[tile][cell] is what the tile adds to aux when it is at that cell
+        self.unit = [[0] * table.size for _ in range(table.size)]
+        for tile in range(1, table.size):
+            goal_row, goal_col = table.goal_pos[tile]
+            for cell in range(table.size):
+                row, col = divmod(cell, dim)
+                self.unit[tile][cell] = (1 << ((row * dim + goal_row) * count_bits)) + \
+                    (1 << ((col * dim + goal_col) * count_bits + self.vertical_bits))
+
+    def evaluate(self, tiles):
+        aux = sum(self.unit[tile][cell] for cell, tile in enumerate(tiles))
+        return self.vertical[aux & self.vertical_mask] + self.horizontal[aux >> self.vertical_bits], aux
+
+    def update(self, h, aux, tile, src, dst):
+        unit = self.unit[tile]
+        aux += unit[dst] - unit[src]
+        return self.vertical[aux & self.vertical_mask] + self.horizontal[aux >> self.vertical_bits], aux
+
+
+HEURISTICS = {
+    'manhattan': Manhattan,
+    'hamming': Hamming,
+    'linear_conflict': LinearConflict,
+    'walking_distance': WalkingDistance,
+}
+HEURISTICS.update({name: partial(AdditivePDB, name) for name in PATTERNS})
+# Heuristics whose tables are cheap to build for any goal layout. The pattern databases and the oracle
+# are built (and saved) per goal layout, so they are only meant for fixed goals
+GOAL_INDEPENDENT = ('manhattan', 'hamming', 'linear_conflict', 'walking_distance')
+
+
+def _distance_oracle(table):
+    # DistanceOracle builds on this module, it is imported when the heuristic is first used
+    from DistanceOracle import DistanceOracle
+    return DistanceOracle(table)
+
+
+HEURISTICS['oracle'] = _distance_oracle
+
+_heuristics = {}
+
+
+def get_heuristic(name, dim, goal=None):
+    """
+        Heuristic objects are shared by all the states of the same dimension and goal layout.
+        evaluate(tiles) computes (h, aux) of a flat tiles sequence, update(h, aux, tile, src, dst)
+        returns them after `tile` moved from cell `src` to the blank cell `dst`
+    """
+    table = get_goal_table(dim, goal)
+    key = (name, table.dim, table.goal)
+    if key not in _heuristics:
+        if name not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic '{name}'")
+        _heuristics[key] = HEURISTICS[name](table)
+    return _heuristics[key]
+
+
+def make_heuristic(name, dim, goal):
+    """
+        A heuristic for a goal layout used by one search only, built without being cached
+    """
+    if name not in GOAL_INDEPENDENT:
+        raise ValueError(f"Heuristic '{name}' is built per goal layout, it cannot be made for a single search")
+    return HEURISTICS[name](GoalTable(dim, tuple(int(tile) for tile in goal)))
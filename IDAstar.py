@@ -1,33 +1,195 @@
-import numpy as np
-from time import time
+from Budget import SearchBudget, get_budget
+from Profiler import VisitHistory
+from PuzzleState import PuzzleState, SolutionPath, get_state_space
 
-MAX_INT = np.iinfo(np.int64).max
-MAX_ELAPSED_TIME = 60*10
-MAX_EXPANDS_PER_ITER = 10
+MAX_INT = (1 << 63) - 1
+# Blank moves by the change of its (row, column)
+STEP_MOVES = {(-1, 0): 'U', (1, 0): 'D', (0, -1): 'L', (0, 1): 'R'}
+SPLIT_DEPTH = 8
 
 
 class IDAStarSolver:
-    def __init__(self, board, heuristic='manhattan'):
+    def __init__(self, board, heuristic='manhattan', in_place=True, track_history=True, transposition_table=None,
+                 profiler=None):
+        self.heuristic = heuristic
+        self.in_place = in_place
+        self.track_history = track_history
+        self.transposition_table = transposition_table
+        self.profiler = profiler
+        self.history = VisitHistory()
+        self.stop_event = None
+        self.reset(board)
+
+    def reset(self, board):
+        """
+            Sets the solver up to solve another board, with the same configuration, history dict and
+            transposition table. The table is emptied, its stamps (iterations) start over
+        """
         self.solution = []
         self.initial_board = board
-        self.heuristic = heuristic
+        self.iterations = 0
         self.nodes_expanded = 1
-        self.history = {}
-        self.s_time = time()
+        self.history.clear()
+        if self.transposition_table is not None:
+            self.transposition_table.clear()
+        self.budget = None
+        self.stop_reason = None
+        self.f_bound = None
 
-    def solve(self):
-        threshold = getattr(self.initial_board, self.heuristic)
+    def solve(self, budget=None):
+        """
+            Out of budget (the default time limit without one), the search stops with NOT_FOUND, stop_reason
+            and f_bound: the threshold of the last iteration, which the optimal cost is at least
+        """
+        self.budget = budget = get_budget(budget)
+        if self.in_place:
+            start = PuzzleState.from_board(self.initial_board, self.heuristic)
+            threshold = start.h
+        else:
+            start = self.initial_board
+            threshold = getattr(self.initial_board, self.heuristic)
+        prof = self.profiler
+        if prof is not None:
+            prof.start()
 
         while True:
-            t = self.search(self.initial_board, threshold)
+            self.iterations += 1
+            self.f_bound = threshold
+            generated = self.nodes_expanded
+            if self.in_place:
+                t = self.search_in_place(start, threshold)
+            else:
+                t = self.search(start, threshold)
+            if prof is not None:
+                prof.iteration(self.nodes_expanded - generated, threshold=threshold, result=t)
             if t == 'FOUND':
+                if not self.in_place:
+                    # The recursive search collects the moves on the unwind, last move first
+                    state = PuzzleState.from_board(start, self.heuristic)
+                    self.solution = SolutionPath(state.space, state.key, ''.join(reversed(self.solution)))
+                if prof is not None:
+                    prof.stop()
                 return threshold
-            if t == MAX_INT or time()-self.s_time > MAX_ELAPSED_TIME or t == 'NOT_FOUND':
+            if t == MAX_INT or t == 'NOT_FOUND' or budget.check(self.nodes_expanded):
+                self.stop_reason = budget.reason
+                if prof is not None:
+                    prof.stop()
                 return 'NOT_FOUND'
             threshold = t
 
+    def search_in_place(self, start, threshold, root_parent=-1):
+        """
+            Depth first search of one threshold on an explicit stack over a single state. Moving down
+            pushes the state's undo record (key, h, aux and the next move to try), moving up pops it.
+            The move leading straight back to the parent is never generated, root_parent is the blank cell
+            of the start's parent when the start is not the root of the whole search.
+            With a transposition table, a state reached again in this iteration at an equal or greater g
+            is pruned, and the f-bound backed up from a state's subtree raises its h in later visits from
+            the same parent. That subtree never moved back to the parent, so the bound holds for no other way in.
+            A profiler counts every move down as an expansion and times the heuristic and the table
+        """
+        space = start.space
+        heuristic, moves, shifts, mask, goal_key = space.heuristic, space.moves, space.shifts, space.mask, space.goal_key
+        track_history = self.track_history
+        tt = self.transposition_table
+        iteration = self.iterations
+        budget = self.budget
+        prof = self.profiler
+        if prof is not None:
+            heuristic = prof.wrap_heuristic(heuristic)
+            tt = prof.wrap_table(tt)
+
+        key, blank, h, aux = start.key, start.blank, start.h, start.aux
+        if track_history:
+            self.update_history(key)
+        if tt is not None:
+            tt.store(key, 0, h, iteration, root_parent)
+        if h > threshold:
+            return h
+        if key == goal_key:
+            self.solution = SolutionPath(space, key, '')
+            return 'FOUND'
+
+        # The undo record of depth d is at index d, next_move[d] indexes moves[blanks[d]].
+        # backed[d] is the lowest f-bound seen below depth d
+        keys, blanks, hs, auxs, next_move, backed = [key], [blank], [h], [aux], [0], [MAX_INT]
+        parent_blank = root_parent
+        depth = 0
+        minimum = MAX_INT
+        while True:
+            options = moves[blank]
+            i = next_move[depth]
+            if i == len(options):
+                if depth == 0:
+                    return minimum
+                bound = backed.pop()
+                if tt is not None and bound != MAX_INT:
+                    tt.raise_bound(key, bound - depth, parent_blank)
+                keys.pop()
+                blanks.pop()
+                hs.pop()
+                auxs.pop()
+                next_move.pop()
+                depth -= 1
+                if bound < backed[depth]:
+                    backed[depth] = bound
+                key, blank, h, aux = keys[depth], blanks[depth], hs[depth], auxs[depth]
+                parent_blank = blanks[depth - 1] if depth else root_parent
+                continue
+            next_move[depth] = i + 1
+
+            next_blank = options[i][0]
+            if next_blank == parent_blank:
+                continue
+            shift = shifts[next_blank]
+            tile = (key >> shift) & mask
+            next_key = key - (tile << shift) + (tile << shifts[blank])
+            next_h, next_aux = heuristic.update(h, aux, tile, next_blank, blank)
+            self.nodes_expanded += 1
+            if track_history:
+                self.update_history(next_key)
+            if self.nodes_expanded >= budget.next_check and self.should_stop():
+                return 'NOT_FOUND'
+
+            f = depth + 1 + next_h
+            if tt is not None:
+                slot = tt.probe(next_key)
+                if slot >= 0:
+                    if tt.parents[slot] == blank and depth + 1 + tt.hs[slot] > f:
+                        f = depth + 1 + tt.hs[slot]
+                    if tt.stamps[slot] == iteration and tt.gs[slot] <= depth + 1:
+                        # Reached again at an equal or greater g, its subtree is covered by the earlier visit
+                        if f < backed[depth]:
+                            backed[depth] = f
+                        continue
+            if f > threshold:
+                if f < minimum:
+                    minimum = f
+                if f < backed[depth]:
+                    backed[depth] = f
+                continue
+            if next_key == goal_key:
+                blanks.append(next_blank)
+                self.solution = SolutionPath(space, start.key, ''.join(
+                    space.move_between(blanks[d], blanks[d + 1]) for d in range(depth + 1)))
+                return 'FOUND'
+            if tt is not None:
+                tt.store(next_key, depth + 1, f - depth - 1, iteration, blank)
+
+            parent_blank = blank
+            key, blank, h, aux = next_key, next_blank, next_h, next_aux
+            keys.append(key)
+            blanks.append(blank)
+            hs.append(h)
+            auxs.append(aux)
+            next_move.append(0)
+            backed.append(MAX_INT)
+            depth += 1
+            if prof is not None:
+                prof.expand()
+
     def search(self, board, threshold):
-        self.update_history(board)
+        self.update_history(str(board))
         f = board.f_value(self.heuristic)
         if f > threshold:
             return f
@@ -37,21 +199,189 @@ class IDAStarSolver:
 
         minimum = MAX_INT
         next_possible_board_list = board.get_possible_next_board(self.heuristic)
-        for idx, next_board in enumerate(next_possible_board_list):
+        for next_board in next_possible_board_list:
             t = self.search(next_board, threshold)
             self.nodes_expanded += 1
             if t == 'FOUND':
-                self.solution.append(board)
+                self.solution.append(STEP_MOVES[(next_board.zero_row - board.zero_row,
+                                                 next_board.zero_column - board.zero_column)])
                 return 'FOUND'
+            if t == 'NOT_FOUND' or self.nodes_expanded >= self.budget.next_check and self.should_stop():
+                return 'NOT_FOUND'
             if t < minimum:
                 minimum = t
-            if idx == MAX_EXPANDS_PER_ITER and time()-self.s_time > MAX_ELAPSED_TIME:
-                return 'NOT_FOUND'
         return minimum
 
-    def update_history(self, board):
-        board_str = str(board)
-        if board_str not in self.history:
-            self.history[board_str] = 1
-        else:
-            self.history[board_str] += 1
+    def should_stop(self):
+        """
+            Out of budget, or another worker of a parallel search found the solution
+        """
+        if self.budget.check(self.nodes_expanded):
+            return True
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def update_history(self, state_key):
+        self.history.visit(state_key)
+
+
+_worker_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _worker_stop_event
+    _worker_stop_event = stop_event
+
+
+def _search_subtree(heuristic, dim, goal, track_history, budget, threshold, g, key, blank, h, aux, parent_blank):
+    """
+        Runs in a pool worker: the in-place search of one threshold below a frontier state at depth g,
+        within what is left of the parent's budget. A task that only starts past the parent's deadline
+        returns NOT_FOUND without searching. Returns the search result ('STOPPED' if another worker
+        found the goal first), the moves from the frontier state to the goal, the nodes expanded and the history
+    """
+    solver = IDAStarSolver(None, heuristic, track_history=track_history)
+    solver.budget = budget.start()
+    solver.stop_event = _worker_stop_event
+    solver.nodes_expanded = 0
+    if _worker_stop_event.is_set():
+        return 'STOPPED', '', 0, {}
+    if solver.budget.check(0):
+        return 'NOT_FOUND', '', 0, {}
+
+    start = PuzzleState(get_state_space(dim, goal, heuristic), key, blank, g, h, aux)
+    t = solver.search_in_place(start, threshold - g, parent_blank)
+    if t == 'FOUND':
+        _worker_stop_event.set()
+    elif t == 'NOT_FOUND':
+        if _worker_stop_event.is_set():
+            t = 'STOPPED'
+    elif t != MAX_INT:
+        t += g
+    return t, str(solver.solution) if t == 'FOUND' else '', solver.nodes_expanded, solver.history
+
+
+class ParallelIDAStarSolver(IDAStarSolver):
+    """
+        IDA* whose thresholds are searched by a process pool. Each threshold expands the first split_depth
+        moves in this process and submits every frontier state within the threshold as its own task, idle
+        workers take the next task from the pool's queue. The first worker to find the goal stops the others
+    """
+    def __init__(self, board, heuristic='manhattan', workers=None, split_depth=SPLIT_DEPTH, track_history=True):
+        super().__init__(board, heuristic, in_place=True, track_history=track_history)
+        self.workers = workers
+        self.split_depth = split_depth
+
+    def solve(self, budget=None):
+        # Imported here so the sequential solver starts without the process pool machinery
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.budget = budget = get_budget(budget)
+        start = PuzzleState.from_board(self.initial_board, self.heuristic)
+        if start.key == start.space.goal_key:
+            self.solution = SolutionPath(start.space, start.key, '')
+            return 0
+        threshold = start.h
+
+        stop_event = multiprocessing.Event()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(stop_event,)) as executor:
+            while True:
+                self.iterations += 1
+                self.f_bound = threshold
+                t = self.search_parallel(executor, start, threshold, stop_event)
+                if t == 'FOUND':
+                    return threshold
+                if t == MAX_INT or t == 'NOT_FOUND' or budget.check(self.nodes_expanded):
+                    self.stop_reason = budget.reason
+                    return 'NOT_FOUND'
+                threshold = t
+
+    def split(self, start, threshold):
+        """
+            Depth first expansion of the first split_depth moves, without the move back to the parent.
+            Returns 'FOUND', or the frontier of (key, moves from the start, blank, h, aux, parent blank)
+            and the lowest f above the threshold met on the way
+        """
+        space = start.space
+        heuristic, moves, shifts, mask, goal_key = space.heuristic, space.moves, space.shifts, space.mask, space.goal_key
+        frontier = []
+        minimum = MAX_INT
+        stack = [(start.key, '', start.blank, start.h, start.aux, -1)]
+        if self.track_history:
+            self.update_history(start.key)
+        while stack:
+            key, path, blank, h, aux, parent_blank = stack.pop()
+            depth = len(path) + 1
+            for next_blank, move in moves[blank]:
+                if next_blank == parent_blank:
+                    continue
+                shift = shifts[next_blank]
+                tile = (key >> shift) & mask
+                next_key = key - (tile << shift) + (tile << shifts[blank])
+                next_h, next_aux = heuristic.update(h, aux, tile, next_blank, blank)
+                self.nodes_expanded += 1
+
+                f = depth + next_h
+                if f > threshold or depth < self.split_depth:
+                    # Frontier states are recorded by the worker searching them
+                    if self.track_history:
+                        self.update_history(next_key)
+                if f > threshold:
+                    if f < minimum:
+                        minimum = f
+                    continue
+                if next_key == goal_key:
+                    self.solution = SolutionPath(space, start.key, path + move)
+                    return 'FOUND'
+                if depth == self.split_depth:
+                    frontier.append((next_key, path + move, next_blank, next_h, next_aux, blank))
+                else:
+                    stack.append((next_key, path + move, next_blank, next_h, next_aux, blank))
+        return frontier, minimum
+
+    def search_parallel(self, executor, start, threshold, stop_event):
+        """
+            Every task gets the budget's deadline and the nodes left of it, a task queued behind the others
+            cannot run past the deadline. The token and the node count of the whole
+            search are checked as the tasks finish, and stop the running ones through stop_event
+        """
+        from concurrent.futures import as_completed
+
+        res = self.split(start, threshold)
+        if res == 'FOUND':
+            return 'FOUND'
+        frontier, minimum = res
+
+        budget = self.budget
+        task_budget = SearchBudget(None, None if budget.max_nodes is None else
+                                   max(budget.max_nodes - self.nodes_expanded, 0), budget.max_memory_kb,
+                                   check_interval=budget.check_interval, until=budget.deadline)
+        space = start.space
+        futures = {
+            executor.submit(_search_subtree, self.heuristic, space.dim, space.goal, self.track_history, task_budget,
+                            threshold, len(path), key, blank, h, aux, parent_blank): path
+            for key, path, blank, h, aux, parent_blank in frontier
+        }
+        result = minimum
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            t, solution, nodes_expanded, history = future.result()
+            self.nodes_expanded += nodes_expanded
+            for state_key, visits in history.items():
+                self.history.visit(state_key, visits)
+            if t == 'STOPPED' or result == 'FOUND':
+                continue
+            if t != 'FOUND' and budget.check(self.nodes_expanded):
+                t = 'NOT_FOUND'
+                stop_event.set()
+            if t == 'FOUND':
+                self.solution = SolutionPath(space, start.key, futures[future] + solution)
+            if t == 'FOUND' or t == 'NOT_FOUND':
+                result = t
+                for pending in futures:
+                    pending.cancel()
+            elif result != 'NOT_FOUND' and t < result:
+                result = t
+        return result
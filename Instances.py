@@ -0,0 +1,102 @@
+import numpy as np
+
+from Heuristics import default_goal
+
+
+def permutation_parity(perms):
+    """
+        Parity of every row of a (n, k) array of permutations of 0..k-1, by cycle decomposition:
+        each of the k steps puts value i in place with at most one swap, for all the rows at once
+    """
+    perms = np.array(perms, dtype=np.int64, copy=True)
+    n, k = perms.shape
+    rows = np.arange(n)
+    positions = np.argsort(perms, axis=1)
+    parity = np.zeros(n, dtype=bool)
+    for i in range(k):
+        j = positions[:, i].copy()
+        value = perms[:, i].copy()
+        perms[rows, j] = value
+        positions[rows, value] = j
+        perms[:, i] = i
+        positions[:, i] = i
+        parity ^= j != i
+    return parity
+
+
+def is_solvable_batch(tiles, goal=None):
+    """
+        A board can reach the goal iff the parity of the permutation taking its cells to the goal cells
+        equals the parity of the blank's manhattan distance from its goal cell.
+        For odd widths this is the usual even inversion count, for even widths it adds the blank-row term
+    """
+    tiles = np.asarray(tiles).reshape(len(tiles), -1)
+    k = tiles.shape[1]
+    dim = int(round(k ** 0.5))
+    goal = np.asarray(default_goal(dim) if goal is None else goal).reshape(-1)
+    goal_cell = np.empty(k, dtype=np.int64)
+    goal_cell[goal] = np.arange(k)
+
+    blank = np.argmax(tiles == 0, axis=1)
+    goal_blank = goal_cell[0]
+    blank_distance = np.abs(blank // dim - goal_blank // dim) + np.abs(blank % dim - goal_blank % dim)
+    return permutation_parity(goal_cell[tiles]) == (blank_distance % 2 == 1)
+
+
+def is_solvable(tiles, goal=None):
+    return bool(is_solvable_batch([np.ravel(tiles)], goal)[0])
+
+
+def _instance_rngs(count, seed, first):
+    """
+        Instance first + i is drawn from its own generator, so it is the same in any batch that holds it
+    """
+    return [np.random.default_rng([seed, index]) for index in range(first, first + count)]
+
+
+def random_instances(count, dim=3, seed=0, goal=None, first=0):
+    """
+        (count, dim * dim) array of uniformly random solvable boards. Unsolvable draws are not rejected,
+        swapping their first two tiles makes them solvable and keeps the distribution uniform
+    """
+    k = dim * dim
+    if not count:
+        return np.empty((0, k), dtype=np.int64)
+    keys = np.stack([rng.random(k) for rng in _instance_rngs(count, seed, first)])
+    tiles = np.argsort(keys, axis=1)
+
+    unsolvable = np.flatnonzero(~is_solvable_batch(tiles, goal))
+    first_tiles = np.argsort(tiles[unsolvable] == 0, axis=1, kind='stable')[:, :2]
+    a, b = first_tiles[:, 0], first_tiles[:, 1]
+    tiles[unsolvable, a], tiles[unsolvable, b] = tiles[unsolvable, b], tiles[unsolvable, a]
+    return tiles
+
+
+def random_walk_instances(count, walk_length, dim=3, seed=0, goal=None, first=0):
+    """
+        (count, dim * dim) array of boards reached from the goal by walk_length random blank moves,
+        none of them undoing the move before it. The optimal cost is at most walk_length
+    """
+    k = dim * dim
+    goal = np.asarray(default_goal(dim) if goal is None else goal).reshape(-1)
+    neighbours = np.full((k, 4), -1, dtype=np.int64)
+    for cell in range(k):
+        row, col = divmod(cell, dim)
+        for i, (row_, col_) in enumerate(((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1))):
+            if 0 <= row_ < dim and 0 <= col_ < dim:
+                neighbours[cell, i] = row_ * dim + col_
+
+    steps = np.stack([rng.random((walk_length, 4)) for rng in _instance_rngs(count, seed, first)], axis=1) \
+        if count else np.empty((walk_length, 0, 4))
+    rows = np.arange(count)
+    tiles = np.tile(goal, (count, 1))
+    blank = np.full(count, int(np.flatnonzero(goal == 0)[0]))
+    previous = np.full(count, -1)
+    for step in steps:
+        options = neighbours[blank]
+        valid = (options >= 0) & (options != previous[:, None])
+        next_blank = options[rows, np.argmax(np.where(valid, step, -1), axis=1)]
+        tiles[rows, blank] = tiles[rows, next_blank]
+        tiles[rows, next_blank] = 0
+        previous, blank = blank, next_blank
+    return tiles
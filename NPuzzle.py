@@ -1,14 +1,26 @@
-from copy import deepcopy
+from copy import copy
 import numpy as np
 
+from Heuristics import get_goal_table, get_heuristic
+from Instances import is_solvable
+from PuzzleState import PuzzleState
+
 
 class Board():
-    def __init__(self, size=3):
+    def __init__(self, size=3, tiles=None):
+        """
+            tiles, e.g. a row of Instances.random_instances, must be solvable. Without them a random
+            solvable board is drawn from np.random
+        """
         self.dim = size
-        self.tiles = self.generate_board(size)
         self.goal_board = self.generate_board(size, is_default_goal=True)
-        while not self.is_solvable():
+        self.goal_table = get_goal_table(size, self.goal_board.reshape(-1))
+        if tiles is not None:
+            self.tiles = np.array(tiles).reshape(size, size)
+        else:
             self.tiles = self.generate_board(size)
+            while not self.is_solvable():
+                self.tiles = self.generate_board(size)
 
         blank_cell = self._find_blank()
         self.zero_row = blank_cell[0][0]
@@ -19,44 +31,57 @@ class Board():
         self.hamming = None
         self.f = None
 
+    def __copy__(self):
+        """
+            Copies the tiles only, the goal board and goal table are shared by all the boards
+        """
+        cls = self.__class__
+        new_copy = cls.__new__(cls)
+        new_copy.__dict__.update(self.__dict__)
+        new_copy.tiles = np.copy(self.tiles)
+        return new_copy
+
     def set_f(self, heuristic='manhattan'):
         if heuristic == 'manhattan':
             self.manhattan = self._manhattan()
         elif heuristic == 'hamming':
             self.hamming = self._hamming()
+        else:
+            self.heuristic_fn = get_heuristic(heuristic, self.dim, self.goal_table.goal)
+            h, self.h_aux = self.heuristic_fn.evaluate(self.tiles.reshape(-1))
+            setattr(self, heuristic, h)
         self.f = getattr(self, heuristic)
 
     def _find_blank(self):
         return np.where(self.tiles == 0)
 
     def _manhattan(self):
+        distance = self.goal_table.manhattan
         manhattan = 0
         for i in range(self.dim):
             for j in range(self.dim):
-                if self.tiles[i][j] != 0:
-                    row, col = find_goal(self.tiles[i][j], self.goal_board)
-                    manhattan += abs(i - row) + abs(j - col)
+                manhattan += distance[self.tiles[i][j]][i * self.dim + j]
         return manhattan
 
     def _update_manhattan(self, prev_loc, next_loc):
-        goal_row, goal_col = find_goal(self.tiles[prev_loc[0]][prev_loc[1]], self.goal_board)
-        self.manhattan -= abs(prev_loc[0] - goal_row) + abs(prev_loc[1] - goal_col)
-        self.manhattan += abs(next_loc[0] - goal_row) + abs(next_loc[1] - goal_col)
+        distance = self.goal_table.manhattan[self.tiles[prev_loc[0]][prev_loc[1]]]
+        self.manhattan -= distance[prev_loc[0] * self.dim + prev_loc[1]]
+        self.manhattan += distance[next_loc[0] * self.dim + next_loc[1]]
 
     def _hamming(self):
+        goal_cell = self.goal_table.goal_cell
         res = 0
         for i in range(self.dim):
             for j in range(self.dim):
-                row, col = find_goal(self.tiles[i][j], self.goal_board)
-                if self.tiles[i][j] != 0 and self.tiles[i][j] != self.tiles[row][col]:
+                if self.tiles[i][j] != 0 and goal_cell[self.tiles[i][j]] != i * self.dim + j:
                     res += 1
         return res
 
     def _update_hamming(self, prev_loc, next_loc):
-        goal_row, goal_col = find_goal(self.tiles[prev_loc[0]][prev_loc[1]], self.goal_board)
-        if goal_row == prev_loc[0] and goal_col == prev_loc[1]:  # The change we made moved a non-zero tile FROM its goal place
+        goal_cell = self.goal_table.goal_cell[self.tiles[prev_loc[0]][prev_loc[1]]]
+        if goal_cell == prev_loc[0] * self.dim + prev_loc[1]:  # The change we made moved a non-zero tile FROM its goal place
             self.hamming += 1
-        elif goal_row == next_loc[0] and goal_col == next_loc[1]:  # The change we made moved a non-zero tile TO its goal place
+        elif goal_cell == next_loc[0] * self.dim + next_loc[1]:  # The change we made moved a non-zero tile TO its goal place
             self.hamming -= 1
 
     def swap_with_zero(self, next_zero_row, next_zero_col, heuristic='manhattan'):
@@ -68,6 +93,12 @@ class Board():
             self._update_manhattan(prev_loc=(next_zero_row, next_zero_col), next_loc=(self.zero_row, self.zero_column))
         elif heuristic == 'hamming':
             self._update_hamming(prev_loc=(next_zero_row, next_zero_col), next_loc=(self.zero_row, self.zero_column))
+        else:
+            h, self.h_aux = self.heuristic_fn.update(getattr(self, heuristic), self.h_aux,
+                                                     int(self.tiles[next_zero_row][next_zero_col]),
+                                                     next_zero_row * self.dim + next_zero_col,
+                                                     self.zero_row * self.dim + self.zero_column)
+            setattr(self, heuristic, h)
 
         # Swap tiles
         self.tiles[self.zero_row, self.zero_column] = self.tiles[next_zero_row, next_zero_col]
@@ -77,10 +108,10 @@ class Board():
         self.zero_row, self.zero_column = next_zero_row, next_zero_col
 
     def _create_next_board(self, next_row, next_col, heuristic='manhattan'):
-        next_board = deepcopy(self)
+        next_board = copy(self)
         next_board.swap_with_zero(next_row, next_col, heuristic)
         next_board.g = self.g + 1
-        next_board.eval_f = next_board.g + next_board.manhattan
+        next_board.eval_f = next_board.f_value(heuristic)
         return next_board
 
     def get_possible_next_board(self, heuristic='manhattan'):
@@ -114,18 +145,9 @@ class Board():
 
     def is_solvable(self):
         """
-        Checks if the board is solvable
+        Checks if the board is solvable, see Instances.is_solvable_batch
         """
-        tiles = np.ndarray.flatten(self.tiles)
-        dim = self.dim * self.dim
-
-        inversions = 0
-        for i in range(dim):
-            for j in range(i, dim):
-                if tiles[i] != 0 and tiles[j] != 0 and tiles[i] > tiles[j]:
-                    inversions += 1
-
-        return inversions % 2 == 0
+        return is_solvable(self.tiles, self.goal_board)
 
     def generate_board(self, size, is_default_goal=False):
         arr = np.arange(size * size)
@@ -134,18 +156,14 @@ class Board():
         arr = arr.reshape(size, size)
         return arr
 
+    def to_state(self, heuristic='manhattan'):
+        """
+            Compact copy of the board for the search hot path
+        """
+        return PuzzleState.from_board(self, heuristic)
+
     def __str__(self):
         return ''.join(str(d) for d in self.tiles.reshape(-1))
 
     def __lt__(self, nxt):
         return self.manhattan < nxt.manhattan
-
-
-def find_goal(current_char, goal_board):
-    """
-        find the correct place of a tile the goal board
-    """
-    for i in range(len(goal_board)):
-        for j in range(len(goal_board)):
-            if goal_board[i][j] == current_char:
-                return i, j
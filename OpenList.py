@@ -0,0 +1,86 @@
+import heapq
+
+
+class HeapOpenList:
+    """
+        Binary heap of (f, h, key, blank, aux), f ties are broken on the lowest h
+    """
+    def __init__(self):
+        self.heap = []
+
+    def push(self, f, h, key, blank, aux):
+        heapq.heappush(self.heap, (f, h, key, blank, aux))
+
+    def pop(self):
+        return heapq.heappop(self.heap)
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class BucketOpenList:
+    """
+        One bucket per integer f value, each holding a LIFO stack per h value, or a single LIFO stack
+        when order_by_h is False. Entries are stored flat, (h, key, blank, aux) after each other.
+        Push is O(1) and pop is O(1) amortized, as the lowest non-empty f and h are only searched upwards
+        from where they were last found
+    """
+    def __init__(self, order_by_h=True):
+        self.order_by_h = order_by_h
+        self.buckets = []
+        self.counts = []
+        self.min_h = []
+        self.min_f = 0
+        self.size = 0
+
+    def push(self, f, h, key, blank, aux):
+        while len(self.buckets) <= f:
+            self.buckets.append([])
+            self.counts.append(0)
+            self.min_h.append(0)
+
+        stacks = self.buckets[f]
+        slot = h if self.order_by_h else 0
+        while len(stacks) <= slot:
+            stacks.append([])
+        stacks[slot].extend((h, key, blank, aux))
+
+        if slot < self.min_h[f]:
+            self.min_h[f] = slot
+        if f < self.min_f:
+            self.min_f = f
+        self.counts[f] += 1
+        self.size += 1
+
+    def pop(self):
+        if not self.size:
+            raise IndexError('pop from an empty open list')
+        f = self.min_f
+        while not self.counts[f]:
+            f += 1
+        self.min_f = f
+
+        stacks = self.buckets[f]
+        slot = self.min_h[f]
+        while not stacks[slot]:
+            slot += 1
+        self.min_h[f] = slot
+
+        stack = stacks[slot]
+        aux = stack.pop()
+        blank = stack.pop()
+        key = stack.pop()
+        h = stack.pop()
+        self.counts[f] -= 1
+        self.size -= 1
+        return f, h, key, blank, aux
+
+    def __len__(self):
+        return self.size
+
+
+OPEN_LISTS = {
+    'heap': HeapOpenList,
+    'bucket': BucketOpenList,
+    'bucket_lifo': lambda: BucketOpenList(order_by_h=False),
+}
@@ -0,0 +1,196 @@
+import mmap
+import os
+import sys
+from array import array
+
+PDB_DIR = os.environ.get('PDB_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdbs'))
+
+# Heuristic name -> (board dimension, sizes of the disjoint tile groups).
+# The groups take the non-zero tiles in the order of their goal cells.
+# A k-tile database is built once per goal layout and saved in PDB_DIR. Its build marks n!/(n-k-1)! states
+# (pattern cells and blank) in a bytearray and takes about 14 times longer per tile on the 4x4 board:
+# about 0.6 s for 3 tiles, 8 s for 4, 2 min for 5 and 20 min and 58 MB for 6. pdb_555 takes about 5 min
+# and pdb_663 about 40 min. A 7-tile group would need 518 MB and several hours, so 4x4 groups stop at 6
+PATTERNS = {
+    'pdb_8': (3, (8,)),
+    'pdb_44': (3, (4, 4)),
+    'pdb_555': (4, (5, 5, 5)),
+    'pdb_663': (4, (6, 6, 3)),
+}
+
+UNKNOWN = 255
+
+
+def count_permutations(n, k):
+    res = 1
+    for i in range(k):
+        res *= n - i
+    return res
+
+
+def rank(cells, n_cells):
+    """
+        Index of an ordered choice of distinct cells among the n!/(n-k)! possible ones
+    """
+    index = 0
+    used = 0
+    for i, cell in enumerate(cells):
+        index = index * (n_cells - i) + cell - bin(used & ((1 << cell) - 1)).count('1')
+        used |= 1 << cell
+    return index
+
+
+def unrank(index, k, n_cells):
+    digits = []
+    for i in range(k - 1, -1, -1):
+        index, digit = divmod(index, n_cells - i)
+        digits.append(digit)
+    free = list(range(n_cells))
+    return [free.pop(digit) for digit in reversed(digits)]
+
+
+class PatternDatabase:
+    """
+        Exact number of pattern tile moves needed to bring the pattern tiles to their goal cells,
+        one byte per ranked placement of the pattern tiles. Moves of the other tiles are free,
+        which keeps databases of disjoint patterns additive
+    """
+    def __init__(self, table, tiles, directory=PDB_DIR):
+        self.table = table
+        self.tiles = tuple(tiles)
+        self.n_cells = table.size
+        self.bits = max(4, (table.size - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        self.shifts = [tile * self.bits for tile in self.tiles]
+        self.path = os.path.join(directory, self.file_name())
+        self.data = None
+        self._file = None
+
+    def file_name(self):
+        goal = ''.join(f'{tile:x}' for tile in self.table.goal)
+        tiles = ''.join(f'{tile:x}' for tile in self.tiles)
+        return f'pdb_{self.table.dim}_{goal}_{tiles}.bin'
+
+    def load(self):
+        self._file = open(self.path, 'rb')
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def load_or_build(self):
+        if not os.path.exists(self.path):
+            self.save(self.build())
+        return self.load()
+
+    def save(self, data):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def build(self):
+        """
+            Backward breadth-first search from the goal over (pattern cells, blank cell).
+            A move of a pattern tile costs 1 and any other move is free, so each layer
+            is closed under the free moves before the next one is expanded
+        """
+        k = len(self.tiles)
+        n_cells = self.n_cells
+        dim = self.table.dim
+        goal_cell = self.table.goal_cell
+        neighbours = []
+        for cell in range(n_cells):
+            row, col = divmod(cell, dim)
+            neighbours.append([row_ * dim + col_ for row_, col_ in
+                               ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1))
+                               if 0 <= row_ < dim and 0 <= col_ < dim])
+
+        data = bytearray([UNKNOWN]) * count_permutations(n_cells, k)
+        expanded = bytearray(count_permutations(n_cells, k + 1))
+        blank_radix = n_cells - k
+
+        layer = array('L', [rank([goal_cell[tile] for tile in self.tiles] + [goal_cell[0]], n_cells)])
+        depth = 0
+        while layer:
+            next_layer = array('L')
+            i = 0
+            while i < len(layer):
+                index = layer[i]
+                i += 1
+                if expanded[index]:
+                    continue
+                expanded[index] = 1
+                if data[index // blank_radix] > depth:
+                    data[index // blank_radix] = depth
+
+                cells = unrank(index, k + 1, n_cells)
+                blank = cells[k]
+                for next_blank in neighbours[blank]:
+                    next_cells = list(cells)
+                    next_cells[k] = next_blank
+                    if next_blank in cells:
+                        next_cells[cells.index(next_blank)] = blank
+                        next_index = rank(next_cells, n_cells)
+                        if not expanded[next_index]:
+                            next_layer.append(next_index)
+                    else:
+                        next_index = rank(next_cells, n_cells)
+                        if not expanded[next_index]:
+                            layer.append(next_index)
+            layer = next_layer
+            depth += 1
+        return data
+
+    def value(self, positions):
+        """
+            positions packs the cell of every tile, tile t at bit t * bits
+        """
+        mask = self.mask
+        return self.data[rank([(positions >> shift) & mask for shift in self.shifts], self.n_cells)]
+
+
+class AdditivePDB:
+    """
+        Sum of disjoint pattern databases. aux packs the cell of every tile
+    """
+    def __init__(self, name, table, directory=PDB_DIR):
+        dim, sizes = PATTERNS[name]
+        if dim != table.dim:
+            raise ValueError(f"Heuristic '{name}' is defined for {dim}x{dim} boards only")
+        self.name = name
+        self.table = table
+        self.bits = max(4, (table.size - 1).bit_length())
+
+        tiles = [tile for tile in table.goal if tile != 0]
+        self.databases = []
+        self.tile_database = [None] * table.size
+        start = 0
+        for size in sizes:
+            database = PatternDatabase(table, tiles[start:start + size], directory).load_or_build()
+            for tile in database.tiles:
+                self.tile_database[tile] = database
+            self.databases.append(database)
+            start += size
+
+    def evaluate(self, tiles):
+        positions = 0
+        for cell, tile in enumerate(tiles):
+            positions |= cell << (int(tile) * self.bits)
+        return sum(database.value(positions) for database in self.databases), positions
+
+    def update(self, h, aux, tile, src, dst):
+        positions = aux + ((dst - src) << (tile * self.bits)) + (src - dst)
+        database = self.tile_database[tile]
+        if database is None:
+            return h, positions
+        return h - database.value(aux) + database.value(positions), positions
+
+
+if __name__ == '__main__':
+    from Heuristics import get_heuristic
+
+    if len(sys.argv) < 2:
+        print(f'Usage: [{"|".join(PATTERNS)}]...')
+    for pattern_name in sys.argv[1:]:
+        get_heuristic(pattern_name, PATTERNS[pattern_name][0])
+        print(f'{pattern_name} is ready in {PDB_DIR}')
@@ -0,0 +1,264 @@
+import json
+from time import perf_counter
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, peak memory is then not reported
+    resource = None
+
+SECTIONS = ('successors', 'heuristic', 'open_list', 'duplicates')
+SAMPLE_INTERVAL = 1 << 12
+
+
+class VisitHistory(dict):
+    """
+        Visits per state, with the duplicate visits (every visit to a state visited more than once)
+        kept up to date as they happen
+    """
+    def __init__(self):
+        super().__init__()
+        self.total_visits = 0
+        self.duplicate_visits = 0
+
+    def visit(self, key, count=1):
+        before = self.get(key, 0)
+        after = before + count
+        self[key] = after
+        self.total_visits += count
+        if after > 1:
+            self.duplicate_visits += count + (before == 1)
+
+    def clear(self):
+        super().clear()
+        self.total_visits = 0
+        self.duplicate_visits = 0
+
+
+class TimedHeuristic:
+    def __init__(self, heuristic, profiler):
+        self._heuristic = heuristic
+        self._sections = profiler.sections
+
+    def evaluate(self, tiles):
+        s_time = perf_counter()
+        res = self._heuristic.evaluate(tiles)
+        self._sections['heuristic'] += perf_counter() - s_time
+        return res
+
+    def update(self, h, aux, tile, src, dst):
+        s_time = perf_counter()
+        res = self._heuristic.update(h, aux, tile, src, dst)
+        self._sections['heuristic'] += perf_counter() - s_time
+        return res
+
+    def __getattr__(self, name):
+        return getattr(self._heuristic, name)
+
+
+class TimedOpenList:
+    def __init__(self, open_list, profiler):
+        self._open_list = open_list
+        self._sections = profiler.sections
+
+    def push(self, *entry):
+        s_time = perf_counter()
+        self._open_list.push(*entry)
+        self._sections['open_list'] += perf_counter() - s_time
+
+    def pop(self):
+        s_time = perf_counter()
+        res = self._open_list.pop()
+        self._sections['open_list'] += perf_counter() - s_time
+        return res
+
+    def __len__(self):
+        return len(self._open_list)
+
+
+class TimedDict(dict):
+    """
+        Best-g (or seen) map whose lookups and updates count as duplicate detection
+    """
+    def __init__(self, items, profiler):
+        super().__init__(items)
+        self._sections = profiler.sections
+
+    def get(self, key, default=None):
+        s_time = perf_counter()
+        res = super().get(key, default)
+        self._sections['duplicates'] += perf_counter() - s_time
+        return res
+
+    def __getitem__(self, key):
+        s_time = perf_counter()
+        res = super().__getitem__(key)
+        self._sections['duplicates'] += perf_counter() - s_time
+        return res
+
+    def __setitem__(self, key, value):
+        s_time = perf_counter()
+        super().__setitem__(key, value)
+        self._sections['duplicates'] += perf_counter() - s_time
+
+
+class TimedTable:
+    """
+        Transposition table whose probes and stores count as duplicate detection
+    """
+    def __init__(self, table, profiler):
+        self._table = table
+        self._sections = profiler.sections
+
+    def probe(self, key):
+        s_time = perf_counter()
+        res = self._table.probe(key)
+        self._sections['duplicates'] += perf_counter() - s_time
+        return res
+
+    def store(self, *args):
+        s_time = perf_counter()
+        self._table.store(*args)
+        self._sections['duplicates'] += perf_counter() - s_time
+
+    def raise_bound(self, *args):
+        s_time = perf_counter()
+        self._table.raise_bound(*args)
+        self._sections['duplicates'] += perf_counter() - s_time
+
+    def __getattr__(self, name):
+        return getattr(self._table, name)
+
+
+class SearchProfiler:
+    """
+        Node counters, time per section, throughput samples and per-iteration stats of one solve.
+        A solver only calls its profiler once per expansion, backtrack or iteration, and times its hot
+        operations through the wrap_* proxies, so a solver without a profiler runs its plain loop.
+        Time not spent in a measured section is successor generation. The samples, the iterations and the
+        backtracks per depth are reported as JSON strings, so a result row stays flat
+    """
+    def __init__(self, sample_interval=SAMPLE_INTERVAL):
+        self.sample_interval = sample_interval
+        self.generated = 0
+        self.expanded = 0
+        self.pruned = 0
+        self.backtracks = 0
+        self.sections = dict.fromkeys(SECTIONS, 0.0)
+        self.samples = []  # (seconds since start, nodes generated)
+        self.iterations = []
+        self.backtrack_depths = {}
+        self.peak_memory_kb = None
+        self.s_time = None
+        self.e_time = None
+        self._next_sample = sample_interval
+        self._iteration_start = (0, 0, 0)
+
+    def start(self):
+        self.s_time = perf_counter()
+
+    def stop(self):
+        self.e_time = perf_counter()
+        if resource is not None:
+            self.peak_memory_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    @property
+    def elapsed(self):
+        return (self.e_time or perf_counter()) - self.s_time
+
+    def wrap_heuristic(self, heuristic):
+        return TimedHeuristic(heuristic, self)
+
+    def wrap_open_list(self, open_list):
+        return TimedOpenList(open_list, self)
+
+    def wrap_dict(self, items):
+        return TimedDict(items, self)
+
+    def wrap_table(self, table):
+        return None if table is None else TimedTable(table, self)
+
+    def expand(self, candidates=0, generated=0):
+        """
+            One expanded node, `generated` of its `candidates` successors were kept
+        """
+        self.expanded += 1
+        self.generated += generated
+        self.pruned += candidates - generated
+        if self.expanded >= self._next_sample:
+            self._next_sample += self.sample_interval
+            self.samples.append((self.elapsed, self.generated))
+
+    def backtrack(self, depth):
+        self.backtracks += 1
+        self.backtrack_depths[depth] = self.backtrack_depths.get(depth, 0) + 1
+
+    def iteration(self, generated=0, **stats):
+        """
+            Closes an iteration (an IDA* threshold) in which `generated` nodes were generated,
+            the ones not expanded were pruned
+        """
+        generated_before, expanded_before, pruned_before = self._iteration_start
+        self.generated += generated
+        self.pruned += generated - (self.expanded - expanded_before)
+        self.iterations.append({
+            **stats,
+            'generated': self.generated - generated_before,
+            'expanded': self.expanded - expanded_before,
+            'pruned': self.pruned - pruned_before,
+            'elapsed': self.elapsed
+        })
+        self._iteration_start = (self.generated, self.expanded, self.pruned)
+
+    def time(self, section, seconds):
+        self.sections[section] += seconds
+
+    def stats(self):
+        elapsed = self.elapsed
+        measured = sum(seconds for section, seconds in self.sections.items() if section != 'successors')
+        sections = dict(self.sections)
+        if not sections['successors']:
+            sections['successors'] = max(elapsed - measured, 0.0)
+        return {
+            'prof_generated': self.generated,
+            'prof_expanded': self.expanded,
+            'prof_pruned': self.pruned,
+            'prof_nodes_per_sec': round(self.generated / elapsed) if elapsed else None,
+            **{f'prof_time_{section}': round(seconds, 6) for section, seconds in sections.items()},
+            'prof_iterations': len(self.iterations),
+            'prof_backtracks': self.backtracks,
+            'peak_memory_kb': self.peak_memory_kb,
+            'prof_samples': json.dumps([[round(seconds, 6), generated] for seconds, generated in self.samples]),
+            'prof_iteration_stats': json.dumps([{**stats, 'elapsed': round(stats['elapsed'], 6)}
+                                                for stats in self.iterations], default=str),
+            'prof_backtrack_depths': json.dumps(dict(sorted(self.backtrack_depths.items())))
+        }
+
+
+def solver_results(solver, experiment_name, actual_cost, elapsed_time):
+    """
+        One result row of a finished (or interrupted) solver
+    """
+    res_dict = {
+        'experiment_name': experiment_name,
+        'actual_cost': actual_cost,
+        'elapsed_time': round(elapsed_time, 6),
+        'expanded_nodes': solver.nodes_expanded,
+        'duplicate_visits': getattr(solver.history, 'duplicate_visits', None),
+        'count_steps': len(solver.solution),
+        'count_unique_nodes': len(solver.history),
+        'peak_open': getattr(solver, 'peak_open', None),
+        'peak_closed': getattr(solver, 'peak_closed', None),
+        'peak_nodes': getattr(solver, 'peak_nodes', None)
+    }
+    if getattr(solver, 'stop_reason', None) is not None:
+        res_dict['stop_reason'] = solver.stop_reason
+    if getattr(solver, 'f_bound', None) is not None:
+        res_dict['f_bound'] = solver.f_bound
+    if getattr(solver, 'suboptimality_bound', None) is not None:
+        res_dict['suboptimality_bound'] = round(solver.suboptimality_bound, 6)
+        res_dict['count_solutions'] = len(solver.solutions)
+    if getattr(solver, 'transposition_table', None) is not None:
+        res_dict.update(solver.transposition_table.stats())
+    if getattr(solver, 'profiler', None) is not None:
+        res_dict.update(solver.profiler.stats())
+    return res_dict
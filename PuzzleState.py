@@ -0,0 +1,263 @@
+from time import perf_counter
+
+from Heuristics import get_heuristic, zero_last_goal
+
+MOVES = 'UDLR'  # The direction the blank moves in
+
+
+def flat_tiles(tiles):
+    """
+        Tiles of a flat or square sequence or of a numpy array, as ints. Solving never imports numpy
+    """
+    if hasattr(tiles, 'ravel'):
+        tiles = tiles.ravel()
+    elif len(tiles) and isinstance(tiles[0], (list, tuple)):
+        tiles = [tile for row in tiles for tile in row]
+    return [int(tile) for tile in tiles]
+
+
+class StateSpace:
+    """
+        Tile packing and per-blank-position move tables of one board dimension, goal layout and heuristic.
+        Tiles are packed into a single integer, cell i takes `bits` bits starting at bit i * bits
+    """
+    def __init__(self, dim, goal, heuristic='manhattan'):
+        self.dim = dim
+        self.size = dim * dim
+        self.bits = max(4, (self.size - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        self.shifts = [cell * self.bits for cell in range(self.size)]
+
+        # A heuristic name is looked up in the shared cache, a heuristic object is used as it is
+        self.heuristic = get_heuristic(heuristic, dim, goal) if isinstance(heuristic, str) else heuristic
+        self.table = self.heuristic.table
+        self.goal = self.table.goal
+        self.goal_key = self.pack(self.goal)
+
+        # moves[blank] lists the (next blank cell, move) pairs in the order the boards generate them
+        moves = []
+        for blank in range(self.size):
+            row, col = divmod(blank, dim)
+            blank_moves = []
+            if row > 0:
+                blank_moves.append((blank - dim, 'U'))
+            if row < dim - 1:
+                blank_moves.append((blank + dim, 'D'))
+            if col > 0:
+                blank_moves.append((blank - 1, 'L'))
+            if col < dim - 1:
+                blank_moves.append((blank + 1, 'R'))
+            moves.append(tuple(blank_moves))
+        self.moves = tuple(moves)
+        self.move_steps = {'U': -dim, 'D': dim, 'L': -1, 'R': 1}
+        self.step_moves = {step: move for move, step in self.move_steps.items()}
+
+    def move_key(self, key, blank, next_blank):
+        """
+            Key after the blank moved from blank to next_blank, moving it back undoes the move
+        """
+        shift = self.shifts[next_blank]
+        tile = (key >> shift) & self.mask
+        return key - (tile << shift) + (tile << self.shifts[blank])
+
+    def move_between(self, blank, next_blank):
+        return self.step_moves[next_blank - blank]
+
+    def blank_of(self, key):
+        return self.unpack(key).index(0)
+
+    def pack(self, tiles):
+        key = 0
+        for cell, tile in enumerate(tiles):
+            key |= int(tile) << self.shifts[cell]
+        return key
+
+    def unpack(self, key):
+        mask = self.mask
+        return tuple((key >> shift) & mask for shift in self.shifts)
+
+
+_state_spaces = {}
+
+
+def get_state_space(dim, goal, heuristic='manhattan'):
+    key = (dim, tuple(int(tile) for tile in goal), heuristic)
+    if key not in _state_spaces:
+        _state_spaces[key] = StateSpace(dim, goal, heuristic)
+    return _state_spaces[key]
+
+
+class PuzzleState:
+    """
+        Compact board state: the packed tiles, blank cell, g and the incrementally updated heuristic.
+        Offers the same interface the solvers use on NPuzzle.Board and Saar/NPuzzle.Board
+    """
+    __slots__ = ('space', 'key', 'blank', 'g', 'h', 'aux', 'rbfs_eval_f')
+
+    def __init__(self, space, key, blank, g, h, aux):
+        self.space = space
+        self.key = key
+        self.blank = blank
+        self.g = g
+        self.h = h
+        self.aux = aux
+        self.rbfs_eval_f = g + h
+
+    @classmethod
+    def from_tiles(cls, tiles, goal, heuristic='manhattan'):
+        tiles = flat_tiles(tiles)
+        dim = int(round(len(tiles) ** 0.5))
+        space = get_state_space(dim, goal, heuristic)
+        h, aux = space.heuristic.evaluate(tiles)
+        return cls(space, space.pack(tiles), tiles.index(0), 0, h, aux)
+
+    @classmethod
+    def from_board(cls, board, heuristic='manhattan'):
+        """
+            Boards without a goal_board are Saar boards, whose zero comes last
+        """
+        if isinstance(board, PuzzleState):
+            return cls.from_tiles(board.tiles, board.space.goal, heuristic)
+        goal = getattr(board, 'goal_board', None)
+        if goal is None:
+            goal = zero_last_goal(board.dim)
+        return cls.from_tiles(board.tiles, flat_tiles(goal), heuristic)
+
+    @property
+    def dim(self):
+        return self.space.dim
+
+    @property
+    def zero_row(self):
+        return self.blank // self.space.dim
+
+    @property
+    def zero_column(self):
+        return self.blank % self.space.dim
+
+    @property
+    def tiles(self):
+        return self.space.unpack(self.key)
+
+    def to_array(self):
+        import numpy as np
+        return np.array(self.tiles).reshape(self.space.dim, self.space.dim)
+
+    def child(self, next_blank):
+        space = self.space
+        shift = space.shifts[next_blank]
+        tile = (self.key >> shift) & space.mask
+        key = self.key - (tile << shift) + (tile << space.shifts[self.blank])
+        h, aux = space.heuristic.update(self.h, self.aux, tile, next_blank, self.blank)
+        return PuzzleState(space, key, next_blank, self.g + 1, h, aux)
+
+    def swap_zero(self, i0, j0, sections=None):
+        """
+            Moves the blank to row i0, column j0 in place, like Saar/NPuzzle.Board.swap_zero, which also
+            adds the time of the heuristic update to a profiler's sections['heuristic']
+        """
+        space = self.space
+        next_blank = i0 * space.dim + j0
+        shift = space.shifts[next_blank]
+        tile = (self.key >> shift) & space.mask
+        self.key += (tile << space.shifts[self.blank]) - (tile << shift)
+        if sections is None:
+            self.h, self.aux = space.heuristic.update(self.h, self.aux, tile, next_blank, self.blank)
+        else:
+            s_time = perf_counter()
+            self.h, self.aux = space.heuristic.update(self.h, self.aux, tile, next_blank, self.blank)
+            sections['heuristic'] += perf_counter() - s_time
+        self.blank = next_blank
+
+    def successors(self):
+        return [self.child(next_blank) for next_blank, _ in self.space.moves[self.blank]]
+
+    def get_possible_next_board(self, heuristic='manhattan'):
+        return self.successors()
+
+    def neighbours(self):
+        return self.successors()
+
+    def f_value(self, heuristic='manhattan'):
+        return self.g + self.h
+
+    def is_solved(self):
+        return self.key == self.space.goal_key
+
+    def __getattr__(self, name):
+        # The solvers read the heuristic value by its name, like on the numpy boards
+        if name != 'space' and name == self.space.heuristic.name:
+            return self.h
+        raise AttributeError(name)
+
+    def __str__(self):
+        return ''.join(str(d) for d in self.tiles)
+
+    def __lt__(self, nxt):
+        return self.h < nxt.h
+
+
+class SolutionPath:
+    """
+        Solution as the string of blank moves from the start state. The solvers keep a move or a parent
+        per state during the search and pass a rebuild function, which is only called on first use
+    """
+    def __init__(self, space, start_key, moves=None, rebuild=None):
+        self.space = space
+        self.start_key = start_key
+        self._moves = moves
+        self._rebuild = rebuild
+
+    @classmethod
+    def from_parent_moves(cls, space, start_key, end_key, parent_moves):
+        """
+            parent_moves maps every reached state but the start to the move that reached it
+        """
+        def rebuild():
+            moves = []
+            key, blank = end_key, space.blank_of(end_key)
+            while key != start_key:
+                move = parent_moves[key]
+                moves.append(move)
+                previous_blank = blank - space.move_steps[move]
+                key = space.move_key(key, blank, previous_blank)
+                blank = previous_blank
+            return ''.join(reversed(moves))
+        return cls(space, start_key, rebuild=rebuild)
+
+    @classmethod
+    def from_keys(cls, space, keys):
+        """
+            keys of the states along the path, start first
+        """
+        def rebuild():
+            blanks = [space.blank_of(key) for key in keys]
+            return ''.join(space.move_between(blank, next_blank) for blank, next_blank in zip(blanks, blanks[1:]))
+        return cls(space, keys[0], rebuild=rebuild)
+
+    @property
+    def moves(self):
+        if self._moves is None:
+            self._moves = self._rebuild()
+            self._rebuild = None
+        return self._moves
+
+    def states(self):
+        """
+            Tiles of every state along the path, from the start to the goal
+        """
+        space = self.space
+        key = self.start_key
+        blank = space.blank_of(key)
+        yield space.unpack(key)
+        for move in self.moves:
+            next_blank = blank + space.move_steps[move]
+            key = space.move_key(key, blank, next_blank)
+            blank = next_blank
+            yield space.unpack(key)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __str__(self):
+        return self.moves
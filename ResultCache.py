@@ -0,0 +1,166 @@
+import os
+import sqlite3
+from time import time
+
+CACHE_PATH = os.environ.get('RESULT_CACHE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'outputs',
+                                                         'result_cache.sqlite'))
+MAX_ENTRIES = 1 << 20
+EVICT_INTERVAL = 1 << 10  # Inserts between two checks of the size bound
+BUSY_TIMEOUT = 30  # Seconds a connection waits for another process's lock
+
+# The 8 symmetries of the square, cell (row, col) of an n x n board goes to these coordinates
+SQUARE_SYMMETRIES = (
+    lambda r, c, n: (r, c),
+    lambda r, c, n: (c, r),
+    lambda r, c, n: (c, n - 1 - r),
+    lambda r, c, n: (n - 1 - r, n - 1 - c),
+    lambda r, c, n: (n - 1 - c, r),
+    lambda r, c, n: (r, n - 1 - c),
+    lambda r, c, n: (n - 1 - r, c),
+    lambda r, c, n: (n - 1 - c, n - 1 - r),
+)
+MOVE_STEPS = {'U': (-1, 0), 'D': (1, 0), 'L': (0, -1), 'R': (0, 1)}
+
+
+class Symmetry:
+    """
+        A symmetry of the square that keeps the goal's blank cell in place. It maps a board to a board of
+        the same optimal cost: the tile at a cell moves to the mirrored cell and is relabeled by the tile
+        whose goal cell is the mirror of its own. Blank moves are mirrored the same way
+    """
+    def __init__(self, transform, table):
+        dim = table.dim
+        self.cells = [transform(*divmod(cell, dim), dim) for cell in range(table.size)]
+        self.cells = [row * dim + col for row, col in self.cells]
+        self.tiles = [table.goal[self.cells[table.goal_cell[tile]]] for tile in range(table.size)]
+        self.moves = {}
+        for move, (dr, dc) in MOVE_STEPS.items():
+            r0, c0 = transform(0, 0, dim)
+            r1, c1 = transform(dr, dc, dim)
+            self.moves[move] = next(m for m, step in MOVE_STEPS.items() if step == (r1 - r0, c1 - c0))
+        self.inverse_moves = {mirrored: move for move, mirrored in self.moves.items()}
+
+    def apply(self, tiles):
+        mirrored = [0] * len(tiles)
+        for cell, tile in enumerate(tiles):
+            mirrored[self.cells[cell]] = self.tiles[tile]
+        return mirrored
+
+
+_symmetries = {}
+
+
+def get_symmetries(table):
+    key = (table.dim, table.goal)
+    if key not in _symmetries:
+        blank = table.goal_cell[0]
+        symmetries = [Symmetry(transform, table) for transform in SQUARE_SYMMETRIES]
+        _symmetries[key] = [symmetry for symmetry in symmetries if symmetry.cells[blank] == blank]
+    return _symmetries[key]
+
+
+class ResultCache:
+    """
+        Optimal cost and moves of solved boards in SQLite, keyed by the canonical board: the smallest packed
+        key among the symmetric images of the board. Holds at most max_entries rows and evicts the least
+        recently used ones. Each process opens its own connection to the shared file, in WAL mode so readers
+        do not block the writer. The table is created and WAL mode (which the file keeps) is set by the first
+        connection, call setup() before starting workers so they only open connections
+    """
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._inserts = 0
+        self._ready = False
+
+    def __getstate__(self):
+        # Workers open their own connection
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        return state
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            self._connection.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT * 1000}')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            if not self._ready:
+                self.setup()
+        return self._connection
+
+    def setup(self):
+        """
+            Creates the table and switches the file to WAL mode. Switching takes an exclusive lock
+            SQLite does not wait for, so it is done once, before any worker connects
+        """
+        self._ready = True
+        connection = self.connection
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS results '
+                           '(key TEXT PRIMARY KEY, cost INTEGER, moves TEXT, last_used REAL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+        return self
+
+    @staticmethod
+    def canonical(state):
+        """
+            Cache key of a PuzzleState and the symmetry that maps it to its canonical board
+        """
+        space = state.space
+        tiles = state.tiles
+        best_key = best_symmetry = None
+        for symmetry in get_symmetries(space.table):
+            key = space.pack(symmetry.apply(tiles))
+            if best_key is None or key < best_key:
+                best_key, best_symmetry = key, symmetry
+        goal = ''.join(f'{tile:x}' for tile in space.goal)
+        return f'{space.dim}_{goal}_{best_key:x}', best_symmetry
+
+    def get(self, state):
+        """
+            (cost, moves) of the state, or None
+        """
+        key, symmetry = self.canonical(state)
+        row = self.connection.execute('SELECT cost, moves FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute('UPDATE results SET last_used = ? WHERE key = ?', (time(), key))
+        cost, moves = row
+        return cost, ''.join(symmetry.inverse_moves[move] for move in moves)
+
+    def put(self, state, cost, moves):
+        key, symmetry = self.canonical(state)
+        moves = ''.join(symmetry.moves[move] for move in moves)
+        self.connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', (key, cost, moves, time()))
+        self._inserts += 1
+        if not self._inserts % EVICT_INTERVAL:
+            self.evict()
+
+    def evict(self):
+        """
+            Deletes the least recently used rows above max_entries
+        """
+        count, = self.connection.execute('SELECT COUNT(*) FROM results').fetchone()
+        if count > self.max_entries:
+            self.connection.execute('DELETE FROM results WHERE key IN '
+                                    '(SELECT key FROM results ORDER BY last_used LIMIT ?)', (count - self.max_entries,))
+
+    def stats(self):
+        return {
+            'cache_hits': self.hits,
+            'cache_misses': self.misses
+        }
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,151 @@
+import json
+import os
+
+# pandas and pyarrow (needed by the columnar formats only) are imported by the functions that use them,
+# so writing CSV or JSONL rows from a solver process does not load them
+# A columnar results path is a directory of part files, one per batch of rows
+COLUMNAR_FORMATS = {'.parquet': 'parquet', '.arrow': 'arrow'}
+BATCH_ROWS = 256  # Rows per part file
+SCAN_ROWS = 1 << 16  # Rows per batch read back
+
+
+def columnar_format(path):
+    return COLUMNAR_FORMATS.get(os.path.splitext(path.rstrip(os.sep))[1])
+
+
+def _table(rows):
+    """
+        Arrow table of result rows. Rows may have different keys, a NOT_FOUND cost is stored as
+        a null cost and found=False so the cost column stays numeric
+    """
+    import pyarrow as pa
+
+    names = list(dict.fromkeys(name for row in rows for name in row))
+    columns = {name: [row.get(name) for row in rows] for name in names}
+    if 'actual_cost' in columns:
+        costs = columns['actual_cost']
+        columns['found'] = [cost != 'NOT_FOUND' for cost in costs]
+        columns['actual_cost'] = [None if cost == 'NOT_FOUND' else cost for cost in costs]
+    return pa.table(columns)
+
+
+def write_part(path, index, rows):
+    """
+        Writes a batch of rows as part file index of the results directory path
+    """
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    fmt = columnar_format(path)
+    os.makedirs(path, exist_ok=True)
+    part = os.path.join(path, f'part-{index:05d}.{fmt}')
+    if fmt == 'parquet':
+        pq.write_table(_table(rows), part)
+    else:
+        feather.write_feather(_table(rows), part)
+
+
+def part_count(path):
+    return len(os.listdir(path)) if os.path.isdir(path) else 0
+
+
+def _dataset(path):
+    """
+        Dataset of a results directory or a CSV file, with one schema for parts written with different
+        columns or with a column that was all null in some of them
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as ds
+
+    fmt = columnar_format(path)
+    if fmt is None:
+        # The cost of a CSV row is a number or NOT_FOUND, it is read as text and converted per batch
+        fmt = ds.CsvFileFormat(convert_options=pa_csv.ConvertOptions(column_types={'actual_cost': pa.string()}))
+    dataset = ds.dataset(path, format=fmt)
+    schemas = [fragment.physical_schema for fragment in dataset.get_fragments()]
+    if len(schemas) > 1:
+        dataset = ds.dataset(path, format=fmt, schema=pa.unify_schemas(schemas, promote_options='permissive'))
+    return dataset
+
+
+def _normalize(df):
+    """
+        Parsed cost and found flag of a batch read from any format
+    """
+    import pandas as pd
+
+    if 'actual_cost' in df:
+        if 'found' not in df:
+            df = df.assign(found=df['actual_cost'].astype(str) != 'NOT_FOUND')
+        df = df.assign(actual_cost=pd.to_numeric(df['actual_cost'], errors='coerce'), found=df['found'].astype(bool))
+    return df.drop(columns=[column for column in df if column == '' or column.startswith('Unnamed:')])
+
+
+def iter_results(paths, columns=None, experiments=None):
+    """
+        DataFrames of at most SCAN_ROWS rows each, over result files of any format: .csv files,
+        .jsonl files and .parquet or .arrow directories. Only the given columns are read from the columnar
+        formats, and rows are kept only if their experiment_name is in experiments
+    """
+    import pandas as pd
+
+    for path in paths:
+        if path.endswith('.jsonl'):
+            with open(path) as f:
+                batches = [pd.DataFrame([json.loads(line) for line in f if line.strip()])]
+        else:
+            dataset = _dataset(path)
+            names = None if columns is None else \
+                [column for column in dict.fromkeys([*columns, 'found']) if column in dataset.schema.names]
+            batches = (batch.to_pandas() for batch in dataset.to_batches(columns=names, batch_size=SCAN_ROWS))
+        for df in batches:
+            if columns is not None:
+                df = df[[column for column in df if column in columns or column == 'found']]
+            if experiments is not None:
+                df = df[df['experiment_name'].isin(experiments)]
+            yield _normalize(df)
+
+
+def aggregate_results(batches, found_res=True):
+    """
+        Count, mean and standard deviation of every numeric column per experiment, accumulated batch by batch
+        from running sums, so the rows never have to be in memory together. found_res selects the solved
+        rows (True), the unsolved ones (False) or all of them ('all', where the mean of found is the share
+        of solved boards and the cost is left out)
+    """
+    import numpy as np
+    import pandas as pd
+
+    counts = sums = squares = sizes = None
+    for df in batches:
+        df = _normalize(df)
+        if found_res == 'all':
+            df = df.drop(columns=['actual_cost'], errors='ignore')
+        else:
+            df = df[df['found'] == found_res].drop(columns=['found'])
+            if found_res is False:
+                df = df.drop(columns=['actual_cost'])
+        if df.empty:  # No rows of this batch are selected, e.g. every board was solved
+            continue
+        numeric = df.drop(columns=['experiment_name', 'seed'], errors='ignore')
+        numeric = numeric.apply(pd.to_numeric, errors='coerce').astype(float).dropna(axis=1, how='all')
+        gb = numeric.groupby(df['experiment_name'])
+        batch = (gb.count(), gb.sum(), (numeric ** 2).groupby(df['experiment_name']).sum(), gb.size())
+        if counts is None:
+            counts, sums, squares, sizes = batch
+        else:
+            counts = counts.add(batch[0], fill_value=0)
+            sums = sums.add(batch[1], fill_value=0)
+            squares = squares.add(batch[2], fill_value=0)
+            sizes = sizes.add(batch[3], fill_value=0)
+    if counts is None:
+        return pd.DataFrame()
+
+    mean = sums / counts.replace(0, np.nan)
+    variance = (squares - counts * mean ** 2) / (counts - 1).where(counts > 1)
+    std = np.sqrt(variance.clip(lower=0))
+    parts = [mean.add_prefix('mean_'), std.add_prefix('std_')]
+    if found_res != 'all':
+        parts.insert(0, sizes.astype(int).rename('count_exp'))
+    return pd.concat(parts, axis=1)
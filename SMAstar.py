@@ -0,0 +1,218 @@
+import heapq
+
+from Budget import get_budget
+from Profiler import VisitHistory
+from PuzzleState import PuzzleState, SolutionPath
+NODE_BYTES = 512  # Rough size of one resident node: the object, its move lists and dicts and its heap entries
+INF = float('inf')
+
+
+class SMANode:
+    """
+        Resident node of the SMA* search tree. pending lists the blank moves whose child is not in memory,
+        forgotten keeps the f backed up from the dropped ones and children the resident ones, by blank move
+    """
+    __slots__ = ('key', 'blank', 'g', 'h', 'aux', 'f', 'parent', 'pending', 'forgotten', 'children',
+                 'open_seq', 'leaf_seq')
+
+    def __init__(self, key, blank, g, h, aux, f, parent, pending):
+        self.key = key
+        self.blank = blank
+        self.g = g
+        self.h = h
+        self.aux = aux
+        self.f = f
+        self.parent = parent
+        self.pending = pending
+        self.forgotten = {}
+        self.children = {}
+        self.open_seq = None
+        self.leaf_seq = None
+
+    def pending_f(self):
+        """
+            Lowest f among the children not in memory, a child never generated is estimated by this node's f
+        """
+        best = INF
+        for move in self.pending:
+            value = self.forgotten.get(move, self.f)
+            if value < best:
+                best = value
+        return best
+
+
+class SMAStarSolver:
+    """
+        Simplified memory-bounded A*. The open node with the lowest f of a missing child (the deepest on ties)
+        generates that one child. Once more than max_nodes nodes are resident, the leaf with the highest f
+        (the shallowest on ties) is dropped and its f is backed up to its parent, which regenerates it when
+        it is the best again, like RBFSSolver's rbfs_eval_f
+    """
+    def __init__(self, board, heuristic='manhattan', max_nodes=None, max_bytes=None):
+        self.heuristic = heuristic
+        if max_nodes is None:
+            max_nodes = (max_bytes or 64 << 20) // NODE_BYTES
+        self.max_nodes = max(max_nodes, 2)
+        self.history = VisitHistory()
+        self.open = []
+        self.leaves = []
+        self.reset(board)
+
+    def reset(self, board):
+        """
+            Sets the solver up to solve another board, with the same memory bound, history dict and heaps
+        """
+        self.solution = []
+        self.initial_board = board
+        self.nodes_expanded = 1
+        self.history.clear()
+        self.peak_nodes = 0
+        self.dropped_nodes = 0
+        self.stop_reason = None
+        self.f_bound = None
+        self.open.clear()
+        self.leaves.clear()
+        self.seq = 0
+        self.goal_key = None
+
+    def touch(self, node):
+        """
+            Pushes the node's current entries to the open list and to the leaves, older entries become stale
+        """
+        self.seq += 1
+        if node.key == self.goal_key:
+            priority = node.f
+        elif node.pending:
+            priority = node.pending_f()
+        else:
+            priority = None
+        if priority is not None:
+            node.open_seq = self.seq
+            heapq.heappush(self.open, (priority, -node.g, self.seq, node))
+        else:
+            node.open_seq = None
+        if not node.children and node.parent is not None:
+            node.leaf_seq = self.seq
+            heapq.heappush(self.leaves, (-node.f, node.g, self.seq, node))
+        else:
+            node.leaf_seq = None
+
+    def backup(self, node):
+        """
+            Raises the f of the node and its ancestors to the lowest f known among their children
+        """
+        while node is not None and node.key != self.goal_key:
+            values = [child.f for child in node.children.values()]
+            values.extend(node.forgotten.get(move, node.f) for move in node.pending)
+            f = min(values) if values else INF
+            if f <= node.f:
+                return
+            node.f = f
+            self.touch(node)
+            node = node.parent
+
+    def drop_worst_leaf(self, memory, keep):
+        """
+            Forgets the worst leaf other than keep. If keep is the only leaf the memory cannot hold a longer path,
+            so keep is dropped with an infinite f
+        """
+        leaf = skipped = None
+        while self.leaves:
+            entry = heapq.heappop(self.leaves)
+            if entry[3].leaf_seq != entry[2]:
+                continue
+            if entry[3] is keep:
+                skipped = entry
+                continue
+            leaf = entry[3]
+            break
+        if skipped is not None:
+            heapq.heappush(self.leaves, skipped)
+        if leaf is None:
+            leaf = keep
+            leaf.f = INF
+
+        parent = leaf.parent
+        del parent.children[leaf.blank]
+        parent.pending.append(leaf.blank)
+        parent.forgotten[leaf.blank] = leaf.f
+        if memory.get(leaf.key) is leaf:
+            del memory[leaf.key]
+        leaf.open_seq = leaf.leaf_seq = None
+        self.dropped_nodes += 1
+        self.touch(parent)
+        self.backup(parent)
+
+    def solve(self, budget=None):
+        """
+            Out of budget (the default time limit without one), the search stops with NOT_FOUND, stop_reason
+            and f_bound: the lowest f still open, which the optimal cost is at least
+        """
+        budget = get_budget(budget)
+        start = PuzzleState.from_board(self.initial_board, self.heuristic)
+        space = start.space
+        heuristic, moves, shifts, mask = space.heuristic, space.moves, space.shifts, space.mask
+        self.goal_key = space.goal_key
+
+        root = SMANode(start.key, start.blank, 0, start.h, start.aux, start.h, None,
+                       [next_blank for next_blank, _ in moves[start.blank]])
+        memory = {root.key: root}  # The resident node of every state, the one of the lowest g reached
+        resident = 1
+        self.peak_nodes = 1
+        self.touch(root)
+
+        while self.open:
+            priority, _, seq, node = heapq.heappop(self.open)
+            if node.open_seq != seq:
+                continue
+            if priority == INF:
+                return 'NOT_FOUND'
+            if node.key == self.goal_key:
+                path = []
+                while node.parent is not None:
+                    path.append(space.move_between(node.parent.blank, node.blank))
+                    node = node.parent
+                self.solution = SolutionPath(space, start.key, ''.join(reversed(path)))
+                self.f_bound = priority
+                return priority
+
+            self.history.visit(node.key)
+            if self.nodes_expanded >= budget.next_check and budget.check(self.nodes_expanded):
+                self.stop_reason, self.f_bound = budget.reason, priority
+                return 'NOT_FOUND'
+
+            move = min(node.pending, key=lambda m: node.forgotten.get(m, node.f))
+            node.pending.remove(move)
+            previous_f = node.forgotten.pop(move, node.f)
+
+            key, blank = node.key, node.blank
+            shift = shifts[move]
+            tile = (key >> shift) & mask
+            next_key = key - (tile << shift) + (tile << shifts[blank])
+            next_g = node.g + 1
+            existing = memory.get(next_key)
+            if existing is not None and existing.g <= next_g:
+                # The state is resident at a g as low, the move is covered by it
+                self.touch(node)
+                self.backup(node)
+                continue
+
+            next_h, next_aux = heuristic.update(node.h, node.aux, tile, move, blank)
+            pending = [] if next_key == self.goal_key else \
+                [next_blank for next_blank, _ in moves[move] if next_blank != blank]
+            child = SMANode(next_key, move, next_g, next_h, next_aux, max(previous_f, next_g + next_h), node, pending)
+            node.children[move] = child
+            memory[next_key] = child
+            resident += 1
+            self.nodes_expanded += 1
+            self.touch(node)
+            self.touch(child)
+            self.backup(node)
+
+            while resident > self.max_nodes:
+                self.drop_worst_leaf(memory, child)
+                resident -= 1
+            if resident > self.peak_nodes:
+                self.peak_nodes = resident
+
+        return 'NOT_FOUND'
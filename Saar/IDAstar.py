@@ -1,26 +1,119 @@
+from copy import copy
 from sys import maxsize
 
+# Blank moves in the order Board.neighbours generates them: up, down, left, right
+ROW_STEPS = (-1, 1, 0, 0)
+COLUMN_STEPS = (0, 0, -1, 1)
+MOVES = 'UDLR'
+
 
 # Given a problem instance, finding the solution using the IDA* Algorithm
 class IDAStarSolver:
-    def __init__(self, board, heuristic='manhattan'):
+    def __init__(self, board, heuristic='manhattan', in_place=True, track_history=True):
         self.solution = []
         self.initial = board
         self.heuristic = heuristic
+        self.in_place = in_place
+        self.track_history = track_history
         self.nodes_expanded = 1
         self.history = {}
+        self.total_visits = 0
+        self.duplicate_visits = 0
+        self.budget = None
+        self.next_check = maxsize
+        self.stop_reason = None
+        self.f_bound = None
 
-    def solve(self):
+    def solve(self, budget=None):
+        """
+            Unlimited without a budget (a SearchBudget of the root package). Out of budget, the search stops
+            with NOT_FOUND, stop_reason and f_bound: the bound of the last iteration, the optimal cost is at least it
+        """
+        self.budget = budget
+        if budget is not None:
+            self.next_check = budget.start(self.nodes_expanded).next_check
         bound = getattr(self.initial, self.heuristic)
+        node = copy(self.initial) if self.in_place else self.initial
 
         while True:
-            t = self.search(self.initial, bound)
+            self.f_bound = bound
+            if self.in_place:
+                t = self.search_in_place(node, bound)
+            else:
+                t = self.search(node, bound)
             if t == 'FOUND':
+                if not self.in_place:
+                    # The recursive search collects the moves on the unwind, last move first
+                    self.solution = ''.join(reversed(self.solution))
                 return bound
-            if t == maxsize:
+            if t == maxsize or t == 'NOT_FOUND':
                 return 'NOT_FOUND'
             bound = t
 
+    def out_of_budget(self):
+        """
+            Called once nodes_expanded reaches next_check: True if the budget ran out, else the next check is set
+        """
+        if self.budget.check(self.nodes_expanded):
+            self.stop_reason = self.budget.reason
+            return True
+        self.next_check = self.budget.next_check
+        return False
+
+    def search_in_place(self, node, bound):
+        """
+        Iterative depth first search on a single board: swap_zero applies a move and swapping
+        the blank back undoes it. The move leading straight back to the parent is never generated
+        """
+        if self.track_history:
+            self.update_history(node)
+        h = getattr(node, self.heuristic)
+        if h > bound:
+            return h
+        if h == 0:
+            return 'FOUND'
+
+        path = []  # Cells the blank left, the last one is where the parent had it
+        next_move = [0]
+        minimum = maxsize
+        while next_move:
+            i = next_move[-1]
+            if i == len(ROW_STEPS):
+                next_move.pop()
+                if path:
+                    node.swap_zero(*path.pop())
+                continue
+            next_move[-1] = i + 1
+
+            row = node.zero_row + ROW_STEPS[i]
+            column = node.zero_column + COLUMN_STEPS[i]
+            if not (0 <= row < node.dim and 0 <= column < node.dim):
+                continue
+            if path and path[-1] == (row, column):
+                continue
+
+            path.append((node.zero_row, node.zero_column))
+            node.swap_zero(row, column)
+            self.nodes_expanded += 1
+            if self.track_history:
+                self.update_history(node)
+            if self.nodes_expanded >= self.next_check and self.out_of_budget():
+                return 'NOT_FOUND'
+
+            h = getattr(node, self.heuristic)
+            f = len(path) + h
+            if f > bound:
+                if f < minimum:
+                    minimum = f
+                node.swap_zero(*path.pop())
+                continue
+            if h == 0:
+                # next_move holds one past the move taken at every depth
+                self.solution = ''.join(MOVES[i - 1] for i in next_move)
+                return 'FOUND'
+            next_move.append(0)
+        return minimum
+
     def search(self, node, bound):
         self.update_history(node)
         f = node.f_value(self.heuristic)
@@ -35,8 +128,11 @@ class IDAStarSolver:
             t = self.search(neighbour, bound)
             self.nodes_expanded += 1
             if t == 'FOUND':
-                self.solution.append(node)
+                step = (neighbour.zero_row - node.zero_row, neighbour.zero_column - node.zero_column)
+                self.solution.append(MOVES[list(zip(ROW_STEPS, COLUMN_STEPS)).index(step)])
                 return 'FOUND'
+            if t == 'NOT_FOUND' or self.nodes_expanded >= self.next_check and self.out_of_budget():
+                return 'NOT_FOUND'
             if t < minimum:
                 minimum = t
         return minimum
@@ -46,10 +142,14 @@ class IDAStarSolver:
 
     def reset_history(self):
         self.history = {}
+        self.total_visits = 0
+        self.duplicate_visits = 0
 
     def update_history(self, board):
+        # Every visit to a board visited more than once is a duplicate, counted as the visits happen
         board_str = str(board)
-        if board_str not in self.history:
-            self.history[board_str] = 1
-        else:
-            self.history[board_str] += 1
+        visits = self.history.get(board_str, 0) + 1
+        self.history[board_str] = visits
+        self.total_visits += 1
+        if visits > 1:
+            self.duplicate_visits += 1 + (visits == 2)
@@ -1,7 +1,10 @@
 from copy import copy
+from time import perf_counter
 
 import numpy as np
 
+from Heuristics import get_heuristic, zero_last_goal
+
 
 class Board(object):
     """ A nxn board for with n^2 - 1 tiles
@@ -27,6 +30,7 @@ class Board(object):
         self.zero_column = np.where(self.tiles == 0)[1][0]
         self.manhattan = self._manhattan()
         self.hamming = self._hamming()
+        self._tracked = None  # [heuristic, h, aux] of the table-driven heuristic read from this board
         self.g = 0
         self.rbfs_eval_f = self.manhattan
 
@@ -36,6 +40,7 @@ class Board(object):
         new_copy.tiles = np.copy(self.tiles)
         new_copy.manhattan = self.manhattan
         new_copy.hamming = self.hamming
+        new_copy._tracked = None if self._tracked is None else list(self._tracked)
         new_copy.dim = self.dim
         new_copy.zero_row = self.zero_row
         new_copy.zero_column = self.zero_column
@@ -62,16 +67,45 @@ class Board(object):
                     res += 1
         return res
 
+    def _table_heuristic(self, name):
+        """
+        Value of a table-driven heuristic from Heuristics. It is evaluated when a solver first reads it
+        and then only that heuristic is updated by swap_zero and carried over to the copies
+        """
+        if self._tracked is None or self._tracked[0].name != name:
+            heuristic = get_heuristic(name, self.dim, zero_last_goal(self.dim))
+            self._tracked = [heuristic, *heuristic.evaluate(self.tiles.ravel().tolist())]
+        return self._tracked[1]
+
+    @property
+    def linear_conflict(self):
+        return self._table_heuristic('linear_conflict')
+
+    @property
+    def walking_distance(self):
+        return self._table_heuristic('walking_distance')
+
+    @property
+    def key(self):
+        """
+        Compact hashable state key
+        """
+        return self.tiles.tobytes()
+
     def equals(self, board):
         """
         :param Board board: Test board
         """
         return np.array_equal(board.tiles, self.tiles)
 
-    def swap_zero(self, i0, j0):
+    def swap_zero(self, i0, j0, sections=None):
         """
         Swaps tile at i0, j0 with the zero tile. Updates the heuristics of the neighbor!
+        With a profiler's sections, the time of the heuristic updates is added to sections['heuristic']
         """
+        if sections is not None:
+            s_time = perf_counter()
+
         # Recalculate manhattan distance
         row = (self.tiles[i0][j0] - 1) // self.dim
         column = (self.tiles[i0][j0] - 1) % self.dim
@@ -86,6 +120,14 @@ class Board(object):
         elif solution_column == self.zero_column and solution_row == self.zero_row:  # The change we made moved a non-zero tile TO its goal place
             self.hamming -= 1
 
+        # Update the table-driven heuristic, if one was read
+        if self._tracked is not None:
+            heuristic, h, aux = self._tracked
+            self._tracked[1:] = heuristic.update(h, aux, int(self.tiles[i0, j0]), i0 * self.dim + j0,
+                                                 self.zero_row * self.dim + self.zero_column)
+        if sections is not None:
+            sections['heuristic'] += perf_counter() - s_time
+
         # Swap tiles
         self.tiles[i0][j0], self.tiles[self.zero_row, self.zero_column] = \
             self.tiles[self.zero_row, self.zero_column], self.tiles[i0, j0]
@@ -142,18 +184,16 @@ class Board(object):
 
     def is_solvable(self):
         """
-        Checks if the board is solvable
+        Checks if the board is solvable: an even number of inversions for odd widths. For even widths
+        every move between rows shifts a tile past dim - 1 others, so the blank's row from the bottom is added
         """
-        tiles = np.ndarray.flatten(self.tiles)
-        dim = self.dim * self.dim
-
-        inversions = 0
-        for i in range(dim):
-            for j in range(i, dim):
-                if tiles[i] != 0 and tiles[j] != 0 and tiles[i] > tiles[j]:
-                    inversions += 1
-
-        return inversions % 2 == 0
+        tiles = self.tiles.reshape(-1)
+        tiles = tiles[tiles != 0]
+        inversions = np.count_nonzero(np.triu(tiles[:, None] > tiles[None, :], 1))
+        if self.dim % 2:
+            return inversions % 2 == 0
+        zero_row = np.where(self.tiles == 0)[0][0]
+        return (inversions + self.dim - zero_row) % 2 == 1
 
     @staticmethod
     def generate_board(size):
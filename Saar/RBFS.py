@@ -1,18 +1,175 @@
+from copy import copy
 from sys import maxsize
+from time import perf_counter
+
+# Blank moves by the change of its (row, column)
+STEP_MOVES = {(-1, 0): 'U', (1, 0): 'D', (0, -1): 'L', (0, 1): 'R'}
+
+
+class SearchStopped(Exception):
+    pass
 
 
 # Given a problem instance, finding the solution using the RBFS Algorithm
 class RBFSSolver:
-    def __init__(self, board, heuristic='manhattan'):
+    def __init__(self, board, heuristic='manhattan', transposition_table=None, profiler=None, in_place=True,
+                 track_history=True):
+        self.heuristic = heuristic
+        self.transposition_table = transposition_table
+        self.profiler = profiler
+        self.in_place = in_place
+        self.track_history = track_history
+        self.history = {}
+        self.reset(board)
+
+    def reset(self, board):
+        """
+            Sets the solver up to solve another board, with the same configuration, history dict and
+            transposition table, which is emptied
+        """
         self.solution = []
         self.initial = board
-        self.heuristic = heuristic
         self.nodes_expanded = 1
-        self.history = {}
+        self.reset_history()
+        if self.transposition_table is not None:
+            self.transposition_table.clear()
+        self.budget = None
+        self.next_check = maxsize
+        self.stop_reason = None
+        self.f_bound = None
 
-    def solve(self):
-        node, _ = self.search(self.initial, maxsize)
-        return node.f_value(self.heuristic) if node else None
+    def solve(self, budget=None):
+        """
+            Unlimited without a budget (a SearchBudget of the root package). Out of budget, the search stops
+            with NOT_FOUND, stop_reason and f_bound: the lowest backed-up f of the start's children,
+            the optimal cost is at least it
+        """
+        self.budget = budget
+        if budget is not None:
+            self.next_check = budget.start(self.nodes_expanded).next_check
+        prof = self.profiler
+        if prof is not None:
+            prof.start()
+        try:
+            if self.in_place:
+                cost = self.search_in_place(copy(self.initial))
+            else:
+                node, _ = self.search(self.initial, maxsize)
+                # The moves are collected on the unwind, last move first
+                self.solution = ''.join(reversed(self.solution))
+                cost = node.f_value(self.heuristic) if node else None
+        except SearchStopped:
+            self.solution = []
+            cost = 'NOT_FOUND'
+        if prof is not None:
+            prof.stop()
+        if cost not in (None, 'NOT_FOUND'):
+            self.f_bound = cost
+        return cost
+
+    def out_of_budget(self):
+        """
+            Called once nodes_expanded reaches next_check: True if the budget ran out, else the next check is set
+        """
+        if self.budget.check(self.nodes_expanded):
+            self.stop_reason = self.budget.reason
+            return True
+        self.next_check = self.budget.next_check
+        return False
+
+    def expand_in_place(self, node, g, stored_f, parent_cell, f_limit):
+        """
+            Level of the stack for the node at depth g: the blank cells of its children, without the parent's,
+            their stored f-values and the level's f-limit. A child's stored f is at least the node's, so
+            a subtree expanded again keeps the bound backed up from it. Each child is applied and undone.
+            The children never move back to the node, so their table entries only hold entering from it
+        """
+        heuristic = self.heuristic
+        tt = self.transposition_table
+        sections = None if self.profiler is None else self.profiler.sections
+        row, column = node.zero_row, node.zero_column
+        cell_in = (row, column)
+        cells, fs = [], []
+        for step in STEP_MOVES:
+            cell = (row + step[0], column + step[1])
+            if not (0 <= cell[0] < node.dim and 0 <= cell[1] < node.dim) or cell == parent_cell:
+                continue
+            node.swap_zero(*cell, sections)
+            f = max(g + 1 + getattr(node, heuristic), stored_f)
+            if tt is not None:
+                slot = tt.probe(node.key)
+                if slot >= 0 and tt.parents[slot] == cell_in:
+                    f = max(f, g + 1 + tt.hs[slot])
+                tt.store(node.key, g + 1, f - g - 1, 0, cell_in)
+            node.swap_zero(row, column, sections)
+            cells.append(cell)
+            fs.append(f)
+        if self.profiler is not None:
+            self.profiler.expand(len(cells), len(cells))
+        return [cells, fs, f_limit, -1]
+
+    def search_in_place(self, node):
+        """
+            RBFS on an explicit stack over a single board: swap_zero applies a move and swapping the blank back
+            undoes it. Every level holds [child cells, stored f-values, f-limit, chosen child]. With at most
+            three children per level, picking the best child and the second best f is a constant-time scan.
+            A level whose best f exceeds its limit is popped and that f is backed up into its parent's level.
+            A profiler times the heuristic updates of every move applied or undone
+        """
+        heuristic = self.heuristic
+        tt = self.transposition_table
+        prof = self.profiler
+        sections = None if prof is None else prof.sections
+        if self.track_history:
+            self.update_history(node)
+        h = getattr(node, heuristic)
+        if h == 0:
+            self.solution = ''
+            return 0
+
+        levels = [self.expand_in_place(node, 0, h, None, maxsize)]
+        path = []  # Cells the blank left, the last one is where the parent had it
+        moves = []
+        while True:
+            level = levels[-1]
+            best = alternative = maxsize
+            chosen = -1
+            for i, f in enumerate(level[1]):
+                if f < best:
+                    best, alternative, chosen = f, best, i
+                elif f < alternative:
+                    alternative = f
+
+            depth = len(path)
+            if best > level[2] or best == maxsize:
+                levels.pop()
+                if not levels:
+                    return None
+                if tt is not None:
+                    tt.raise_bound(node.key, best - depth, path[-1])
+                if prof is not None:
+                    prof.backtrack(depth)
+                node.swap_zero(*path.pop(), sections)
+                moves.pop()
+                parent = levels[-1]
+                parent[1][parent[3]] = best
+                continue
+
+            level[3] = chosen
+            cell = level[0][chosen]
+            moves.append(STEP_MOVES[(cell[0] - node.zero_row, cell[1] - node.zero_column)])
+            path.append((node.zero_row, node.zero_column))
+            node.swap_zero(*cell, sections)
+            self.nodes_expanded += 1
+            if self.track_history:
+                self.update_history(node)
+            if getattr(node, heuristic) == 0:
+                self.solution = ''.join(moves)
+                return depth + 1
+            if self.nodes_expanded >= self.next_check and self.out_of_budget():
+                self.f_bound = min(levels[0][1])
+                return 'NOT_FOUND'
+            levels.append(self.expand_in_place(node, depth + 1, best, path[-1], min(level[2], alternative)))
 
     def search(self, node, f_limit):
         self.update_history(node)
@@ -21,36 +178,74 @@ class RBFSSolver:
         if getattr(node, self.heuristic) == 0:
             return node, None
 
+        # The boards update their heuristics as they are generated, so a profiler times both as successors
+        prof = self.profiler
+        if prof is not None:
+            s_time = perf_counter()
         children = node.neighbours()
+        if prof is not None:
+            prof.time('successors', perf_counter() - s_time)
+            prof.expand(len(children), len(children))
 
+        tt = self.transposition_table
+        if prof is not None:
+            s_time = perf_counter()
         count = -1
         for child in children:
             count += 1
+            if tt is not None:
+                # A regenerated child starts from the f-bound backed up from its forgotten subtree.
+                # Pruning it on g would lose that subtree's contribution to the backed-up f of this node
+                slot = tt.probe(child.key)
+                if slot >= 0:
+                    child.rbfs_eval_f = max(child.rbfs_eval_f, child.g + tt.hs[slot])
+                tt.store(child.key, child.g, child.rbfs_eval_f - child.g)
             successors.append((child.rbfs_eval_f, count, child))
+        if prof is not None and tt is not None:
+            prof.time('duplicates', perf_counter() - s_time)
 
         if not len(successors):
             return None, maxsize
 
         while len(successors):
+            if prof is not None:
+                s_time = perf_counter()
             successors.sort()
+            if prof is not None:
+                prof.time('open_list', perf_counter() - s_time)
             best_node = successors[0][2]
             if best_node.rbfs_eval_f > f_limit:
                 return None, best_node.rbfs_eval_f
 
-            alternative = successors[1][0]
+            if node is self.initial:
+                self.f_bound = successors[0][0]
+            if self.nodes_expanded >= self.next_check and self.out_of_budget():
+                raise SearchStopped()
+            alternative = successors[1][0] if len(successors) > 1 else maxsize
             result, best_node.rbfs_eval_f = self.search(best_node, min(f_limit, alternative))
+            if result is None:
+                if tt is not None:
+                    tt.raise_bound(best_node.key, best_node.rbfs_eval_f - best_node.g)
+                if prof is not None:
+                    prof.backtrack(best_node.g)
             successors[0] = (best_node.rbfs_eval_f, successors[0][1], best_node)
             self.nodes_expanded += 1
 
             if result is not None:
+                self.solution.append(STEP_MOVES[(best_node.zero_row - node.zero_row,
+                                                 best_node.zero_column - node.zero_column)])
                 return result, None
 
     def reset_history(self):
-        self.history = {}
+        self.history.clear()
+        self.total_visits = 0
+        self.duplicate_visits = 0
 
     def update_history(self, board):
+        # Every visit to a board visited more than once is a duplicate, counted as the visits happen
         board_str = str(board)
-        if board_str not in self.history:
-            self.history[board_str] = 1
-        else:
-            self.history[board_str] += 1
+        visits = self.history.get(board_str, 0) + 1
+        self.history[board_str] = visits
+        self.total_visits += 1
+        if visits > 1:
+            self.duplicate_visits += 1 + (visits == 2)
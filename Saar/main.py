@@ -2,10 +2,11 @@ import os.path
 import sys
 import time
 
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
-import pandas as pd
+
+# The boards take their table-driven heuristics from the repository root's Heuristics.
+# Appended, so this folder's NPuzzle still comes first
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from IDAstar import IDAStarSolver
 
@@ -19,15 +20,19 @@ def run_solver(solver):
     actual_cost = solver.solve()
     end = time.time()
     elapsed_time = end - start
-    sr = pd.Series(solver.history.values(), index=solver.history.keys())
-    desc = sr.describe()
+    count = len(solver.history)
     res_dict = {
         'Actual Cost': actual_cost,
         'Elapsed Time': elapsed_time,
         'Expanded Nodes': solver.nodes_expanded,
-        'Duplicate Visits': sr[(sr > 1)].sum(),
-        **{f'{f_n} Visits'.title(): val for f_n, val in desc.items()}
+        'Duplicate Visits': solver.duplicate_visits,
+        'Count Visits': count,
+        'Mean Visits': solver.total_visits / count if count else None
     }
+    if getattr(solver, 'transposition_table', None) is not None:
+        res_dict.update(solver.transposition_table.stats())
+    if getattr(solver, 'profiler', None) is not None:
+        res_dict.update(solver.profiler.stats())
     for k, v in res_dict.items():
         print(k, v, sep=' = ')
 
@@ -39,6 +44,11 @@ if __name__ == '__main__':
         print('Usage: [Seed] [Save_Directory]')
 
     else:
+        # The plotting stack is only loaded by this script, importing run_solver does not load it
+        import matplotlib.pyplot as plt
+        import pandas as pd
+        import seaborn as sns
+
         _, seed, fld = sys.argv
         seed = int(seed)
         np.random.seed(seed)
@@ -0,0 +1,487 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+from collections import deque
+from itertools import count
+from multiprocessing import Pipe, Process, Value
+from time import monotonic, time
+
+from Batch import SOLVERS, to_state, warm_up
+from Budget import SearchBudget
+from Heuristics import HEURISTICS, default_goal, get_goal_table, zero_last_goal
+from Profiler import solver_results
+from PuzzleState import flat_tiles
+
+BATCH_SIZE = 16  # Most jobs sent to a worker at once
+BATCH_WINDOW = 0.002  # Seconds the last idle worker waits for a batch to fill
+DEFAULT_TIMEOUT = 10.0  # Seconds a request may take when it sets no timeout
+KILL_GRACE = 1.0  # Seconds a worker may overrun a deadline before it is killed and replaced
+TIMER_GRACE = 0.1  # Seconds a solver may overrun its budget before the worker's timer interrupts it
+REPLY_MARGIN = 0.05  # Seconds before the deadline a solver stops, so its row arrives in time
+WATCH_INTERVAL = 0.25
+LATENCY_SAMPLES = 10000
+WARM = ((3, 'manhattan', None), (4, 'manhattan', None))
+STOP_STATUS = {'time': 'timeout', 'cancelled': 'cancelled'}  # Status of a job whose budget stopped it
+
+
+class Cancelled(Exception):
+    pass
+
+
+# State of a worker process: the job it is running and the job the service asked it to drop
+_running = 0
+_cancel = None
+
+
+class JobToken:
+    """
+        Cancellation token of one job, set once the service writes the job's id to the worker's cancel value
+    """
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def is_set(self):
+        return _cancel.value == self.job_id
+
+
+def _interrupt(signum, frame):
+    """
+        Backstop for a solver overrunning its budget. Ignored between jobs, so a late signal never stops the next job
+    """
+    if _running:
+        raise Cancelled('timeout')
+
+
+def _run_job(job_id, board, solver, heuristic, goal, deadline):
+    """
+        The solver stops itself at the deadline, or once the job is cancelled, with the best it has so far
+    """
+    global _running
+    name = f'{solver}_{heuristic}'
+    remaining = deadline - time()
+    if remaining <= 0:
+        return {'experiment_name': name, 'actual_cost': 'NOT_FOUND', 'status': 'timeout', 'moves': None}
+    instance = SOLVERS[solver](to_state(board, heuristic, goal), heuristic)
+    budget = SearchBudget(time_limit=max(remaining - REPLY_MARGIN, 0), token=JobToken(job_id))
+    status = 'ok'
+    s_time = time()
+    try:
+        _running = job_id
+        signal.setitimer(signal.ITIMER_REAL, remaining + TIMER_GRACE)
+        actual_cost = instance.solve(budget)
+    except Cancelled as e:
+        actual_cost, status = 'NOT_FOUND', e.args[0]
+    finally:
+        _running = 0
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    if actual_cost in ('NOT_FOUND', None) and budget.reason is not None:
+        status = STOP_STATUS.get(budget.reason, budget.reason)
+    row = solver_results(instance, name, actual_cost, time() - s_time)
+    row['status'] = status
+    row['moves'] = str(instance.solution) if actual_cost not in ('NOT_FOUND', None) else None
+    return row
+
+
+def _worker(conn, cancel, warm):
+    """
+        Solver process: keeps its tables loaded across batches and reports the start and the row of every job
+    """
+    global _cancel
+    _cancel = cancel
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGALRM, _interrupt)
+    for dim, heuristic, goal in warm:
+        warm_up(dim, heuristic, goal)
+    while True:
+        try:
+            batch = conn.recv()
+        except EOFError:
+            return
+        if batch is None:
+            return
+        for job in batch:
+            conn.send(('start', job[0], None))
+            try:
+                row = _run_job(*job)
+            except Exception as e:
+                row = {'experiment_name': f'{job[2]}_{job[3]}', 'actual_cost': 'NOT_FOUND', 'status': 'error',
+                       'error': str(e), 'moves': None}
+            conn.send(('done', job[0], row))
+
+
+class Job:
+    """
+        One computation, shared by every request for the same board, solver, heuristic and goal
+    """
+    __slots__ = ('id', 'key', 'board', 'solver', 'heuristic', 'goal', 'deadline', 'future', 'waiters', 'worker')
+
+    def __init__(self, job_id, key, board, solver, heuristic, goal, deadline, future):
+        self.id = job_id
+        self.key = key
+        self.board = board
+        self.solver = solver
+        self.heuristic = heuristic
+        self.goal = goal
+        self.deadline = deadline
+        self.future = future
+        self.waiters = 0
+        self.worker = None
+
+    def message(self):
+        return self.id, self.board, self.solver, self.heuristic, self.goal, self.deadline
+
+
+class WorkerHandle:
+    """
+        A solver process and the jobs sent to it, its messages are read on the event loop
+    """
+    def __init__(self, service):
+        self.service = service
+        self.conn, child_conn = Pipe()
+        self.cancel = Value('q', 0, lock=False)
+        self.process = Process(target=_worker, args=(child_conn, self.cancel, service.warm), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = {}
+        self.running = None
+        self.alive = True
+        asyncio.get_running_loop().add_reader(self.conn.fileno(), self.on_readable)
+
+    def send(self, batch):
+        for job in batch:
+            job.worker = self
+            self.jobs[job.id] = job
+        self.conn.send([job.message() for job in batch])
+
+    def stop_job(self, job):
+        if self.running is job and self.alive:
+            self.cancel.value = job.id
+
+    def on_readable(self):
+        try:
+            while self.alive and self.conn.poll():
+                kind, job_id, row = self.conn.recv()
+                job = self.jobs.get(job_id)
+                if kind == 'start':
+                    self.running = job
+                    if job is not None and not job.waiters:
+                        self.stop_job(job)
+                    continue
+                self.running = None
+                self.jobs.pop(job_id, None)
+                if job is not None:
+                    self.service.finish(job, row)
+                if not self.jobs:
+                    self.service.idle.put_nowait(self)
+        except (EOFError, OSError):
+            self.service.replace(self)
+
+    def close(self, kill=False):
+        if not self.alive:
+            return
+        self.alive = False
+        asyncio.get_running_loop().remove_reader(self.conn.fileno())
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(KILL_GRACE)
+        self.conn.close()
+
+
+class SolverService:
+    """
+        Solves boards on a pool of solver processes for asyncio callers. Queued requests are sent to idle
+        workers in batches of up to batch_size, requests for a board already queued or running share its
+        computation, and every request has a deadline: it is answered with a timeout row once it passes.
+        The solvers run under a budget of the same deadline, whose cancellation token stops a job left without
+        requests. A worker overrunning a deadline by KILL_GRACE is killed and replaced
+    """
+    def __init__(self, workers=None, batch_size=BATCH_SIZE, batch_window=BATCH_WINDOW, warm=WARM):
+        self.n_workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.warm = tuple(warm)
+        self.workers = []
+        self.idle = None
+        self.queue = deque()
+        self.queued = None
+        self.in_flight = {}
+        self.job_ids = count(1)
+        self.tasks = []
+        self.s_time = monotonic()
+        self.requests = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.deduplicated = 0
+        self.restarts = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    async def start(self):
+        self.idle = asyncio.Queue()
+        self.queued = asyncio.Event()
+        for _ in range(self.n_workers):
+            self.add_worker()
+        self.tasks = [asyncio.create_task(self.dispatch()), asyncio.create_task(self.watch())]
+        return self
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        for worker in self.workers:
+            worker.close()
+        self.workers = []
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def add_worker(self):
+        worker = WorkerHandle(self)
+        self.workers.append(worker)
+        self.idle.put_nowait(worker)
+
+    def replace(self, worker, status='error'):
+        """
+            Ends a dead or stuck worker, its unfinished jobs with status, and starts another one
+        """
+        if not worker.alive:
+            return
+        worker.close(kill=True)
+        self.workers.remove(worker)
+        for job in worker.jobs.values():
+            self.finish(job, {'experiment_name': f'{job.solver}_{job.heuristic}', 'actual_cost': 'NOT_FOUND',
+                              'status': status, 'moves': None})
+        self.restarts += 1
+        self.add_worker()
+
+    def finish(self, job, row):
+        if self.in_flight.get(job.key) is job:
+            del self.in_flight[job.key]
+        if not job.future.done():
+            job.future.set_result(row)
+
+    async def dispatch(self):
+        while True:
+            worker = await self.idle.get()
+            if not worker.alive:
+                continue
+            while not self.queue:
+                self.queued.clear()
+                await self.queued.wait()
+            if self.batch_window and len(self.queue) < self.batch_size and self.idle.empty():
+                await asyncio.sleep(self.batch_window)
+
+            # Each idle worker takes its share of the queue, so a burst is spread over all of them
+            share = min(self.batch_size, -(-len(self.queue) // (self.idle.qsize() + 1)))
+            batch = []
+            while self.queue and len(batch) < share:
+                job = self.queue.popleft()
+                if job.waiters:
+                    batch.append(job)
+                else:
+                    self.finish(job, None)
+            if batch and worker.alive:
+                worker.send(batch)
+            else:
+                self.queue.extendleft(reversed(batch))
+                self.idle.put_nowait(worker)
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(WATCH_INTERVAL)
+            now = time()
+            for worker in list(self.workers):
+                job = worker.running
+                if job is not None and now > job.deadline + KILL_GRACE:
+                    self.replace(worker, status='timeout')
+
+    async def solve(self, board, solver='idastar', heuristic='manhattan', zero_last=False, timeout=DEFAULT_TIMEOUT):
+        """
+            Result row of one board, with status 'ok', 'timeout' or 'error' and the moves of its solution.
+            A board that cannot reach the goal is rejected before it takes a worker
+        """
+        if solver not in SOLVERS:
+            raise ValueError(f"Unknown solver '{solver}'")
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic '{heuristic}'")
+        tiles = flat_tiles(board)
+        dim = int(round(len(tiles) ** 0.5))
+        if dim * dim != len(tiles) or sorted(tiles) != list(range(len(tiles))):
+            raise ValueError('A board holds the numbers 0 to n*n-1 once each')
+        goal = zero_last_goal(dim) if zero_last else default_goal(dim)
+        if not get_goal_table(dim, goal).is_solvable(tiles):
+            raise ValueError(f"The board cannot reach the {'zero last' if zero_last else 'zero first'} goal")
+        key = (solver, heuristic, tuple(goal), tuple(tiles))
+        deadline = time() + timeout
+        self.requests += 1
+        s_time = monotonic()
+
+        job = self.in_flight.get(key)
+        if job is not None and (job.worker is None or job.deadline >= deadline):
+            # A queued job is given the latest deadline of its requests, a running one keeps its own
+            job.deadline = max(job.deadline, deadline)
+            self.deduplicated += 1
+        else:
+            job = Job(next(self.job_ids), key, tiles, solver, heuristic, list(goal), deadline,
+                      asyncio.get_running_loop().create_future())
+            self.in_flight[key] = job
+            self.queue.append(job)
+            self.queued.set()
+
+        job.waiters += 1
+        try:
+            row = await asyncio.wait_for(asyncio.shield(job.future), max(deadline - time(), 0))
+        except asyncio.TimeoutError:
+            row = None
+        finally:
+            job.waiters -= 1
+            if not job.waiters and not job.future.done():
+                if self.in_flight.get(job.key) is job:
+                    del self.in_flight[job.key]
+                if job.worker is not None:
+                    job.worker.stop_job(job)
+
+        if row is None:
+            row = {'experiment_name': f'{solver}_{heuristic}', 'actual_cost': 'NOT_FOUND', 'status': 'timeout',
+                   'moves': None}
+        if row['status'] == 'timeout':
+            self.timeouts += 1
+        self.completed += 1
+        self.latencies.append(monotonic() - s_time)
+        return dict(row)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return round(latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1000, 3) if latencies else None
+        uptime = monotonic() - self.s_time
+        return {
+            'workers': len(self.workers),
+            'requests': self.requests,
+            'completed': self.completed,
+            'timeouts': self.timeouts,
+            'deduplicated': self.deduplicated,
+            'worker_restarts': self.restarts,
+            'queued': len(self.queue),
+            'throughput_per_sec': round(self.completed / uptime, 3) if uptime else None,
+            'p50_latency_ms': percentile(0.5),
+            'p99_latency_ms': percentile(0.99)
+        }
+
+    async def answer(self, request):
+        """
+            Response of one JSON request: board, and optionally solver, heuristic, zero_last, timeout and an id
+            echoed back
+        """
+        try:
+            row = await self.solve(request['board'], request.get('solver', 'idastar'),
+                                   request.get('heuristic', 'manhattan'), bool(request.get('zero_last', False)),
+                                   float(request.get('timeout', DEFAULT_TIMEOUT)))
+        except (KeyError, TypeError, ValueError) as e:
+            row = {'status': 'error', 'error': str(e)}
+        if 'id' in request:
+            row['id'] = request['id']
+        return row
+
+    async def handle_connection(self, reader, writer):
+        """
+            A connection speaks HTTP (POST /solve with a JSON request, GET /stats) or sends JSON requests one per
+            line, which are answered one per line as they finish, with their id
+        """
+        try:
+            first = await reader.readline()
+            if first.startswith((b'POST ', b'GET ')):
+                await self.handle_http(first, reader, writer)
+            else:
+                await self.handle_lines(first, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_lines(self, line, reader, writer):
+        async def reply(request):
+            writer.write(json.dumps(await self.answer(request), default=str).encode() + b'\n')
+
+        pending = set()
+        try:
+            while line:
+                if line.strip():
+                    try:
+                        task = asyncio.create_task(reply(json.loads(line)))
+                    except json.JSONDecodeError as e:
+                        writer.write(json.dumps({'status': 'error', 'error': str(e)}).encode() + b'\n')
+                    else:
+                        pending.add(task)
+                        task.add_done_callback(pending.discard)
+                line = await reader.readline()
+            if pending:
+                await asyncio.gather(*pending)
+            await writer.drain()
+        finally:
+            # Requests of a closed connection are dropped, which cancels jobs nobody else waits for
+            for task in pending:
+                task.cancel()
+
+    async def handle_http(self, first, reader, writer):
+        method, path = first.decode().split()[:2]
+        length = 0
+        while True:
+            header = await reader.readline()
+            if header in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = header.decode().partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        body = await reader.readexactly(length) if length else b''
+
+        status = '200 OK'
+        if method == 'POST' and path == '/solve':
+            try:
+                response = await self.answer(json.loads(body))
+            except json.JSONDecodeError as e:
+                status, response = '400 Bad Request', {'status': 'error', 'error': str(e)}
+        elif method == 'GET' and path == '/stats':
+            response = self.stats()
+        else:
+            status, response = '404 Not Found', {'status': 'error', 'error': f'No route {method} {path}'}
+        payload = json.dumps(response, default=str).encode()
+        writer.write(f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n'
+                     f'Connection: close\r\n\r\n'.encode() + payload)
+        await writer.drain()
+
+
+async def serve(host='127.0.0.1', port=8765, **service_kwargs):
+    async with SolverService(**service_kwargs) as service:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve board solve requests over TCP, as JSON lines or HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None, help='solver processes, one per CPU by default')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--warm', nargs='*', default=[f'{dim}:{heuristic}' for dim, heuristic, _ in WARM],
+                        help='dim:heuristic tables every worker loads before its first request')
+    args = parser.parse_args(argv)
+    warm = [(int(dim), heuristic, None) for dim, heuristic in (item.split(':') for item in args.warm)]
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, batch_size=args.batch_size, warm=warm))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import json
+import sys
+from itertools import chain
+
+from Batch import SOLVERS, solve_many
+from Budget import DEFAULT_TIME_LIMIT, SearchBudget
+from Heuristics import zero_last_goal
+from OpenList import OPEN_LISTS
+
+
+def parse_board(line):
+    """
+        Tiles of one line: numbers separated by spaces or commas. Lines of the benchmark instance files
+        work too, the index and cost before the tiles are skipped. None for blank and comment lines
+    """
+    line = line.split('#', 1)[0]
+    tokens = [token for token in line.replace(',', ' ').split() if token.isdigit()]
+    if not tokens:
+        return None
+    dim = int(len(tokens) ** 0.5)
+    return [int(token) for token in tokens[len(tokens) - dim * dim:]]
+
+
+def read_boards(files):
+    for f in files:
+        for line in f:
+            board = parse_board(line)
+            if board is not None:
+                yield board
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve boards read from files or stdin, one per line, and print '
+                                                 'the blank moves (U, D, L, R) of each solution')
+    parser.add_argument('files', nargs='*', type=argparse.FileType('r'), default=[sys.stdin])
+    parser.add_argument('--solver', default='idastar', choices=sorted(SOLVERS))
+    parser.add_argument('--heuristic', default='manhattan')
+    parser.add_argument('--zero-last', action='store_true', help='the goal has the blank last, not first')
+    parser.add_argument('--workers', type=int, default=None, help='solve on a process pool of this size')
+    parser.add_argument('--cache', default=None, help='SQLite result cache file')
+    parser.add_argument('--open-list', default=None, choices=sorted(OPEN_LISTS),
+                        help='open list of the astar solver, a binary heap by default')
+    parser.add_argument('--epsilon', type=float, default=None,
+                        help='initial weight of the arastar and wastar solvers, which may return solutions costing '
+                             'up to epsilon times the optimum')
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help='seconds each board may take, the arastar solver keeps improving its solution until then')
+    parser.add_argument('--max-nodes', type=int, default=None, help='nodes each board may generate')
+    parser.add_argument('--stats', action='store_true', help='print the JSON result row of every board instead')
+    args = parser.parse_args(argv)
+    if args.epsilon is not None and args.solver not in ('arastar', 'wastar'):
+        parser.error(f'--epsilon only applies to the arastar and wastar solvers, not {args.solver}')
+    if args.open_list is not None and args.solver != 'astar':
+        parser.error(f'--open-list only applies to the astar solver, not {args.solver}')
+
+    boards = iter(read_boards(args.files))
+    first = next(boards, None)
+    if first is None:
+        return
+    goal = zero_last_goal(int(round(len(first) ** 0.5))) if args.zero_last else None
+    solver_kwargs = {}
+    if args.epsilon is not None:
+        solver_kwargs['epsilon'] = args.epsilon
+    if args.open_list is not None:
+        solver_kwargs['open_list'] = args.open_list
+    if args.time_limit is not None or args.max_nodes is not None:
+        solver_kwargs['budget'] = SearchBudget(args.time_limit or DEFAULT_TIME_LIMIT, args.max_nodes)
+    cache = None
+    if args.cache:
+        from ResultCache import ResultCache
+        cache = ResultCache(args.cache)
+
+    for row in solve_many(chain([first], boards), args.solver, args.heuristic, goal, workers=args.workers,
+                          cache=cache, **solver_kwargs):
+        if args.stats:
+            print(json.dumps(row, default=str), flush=True)
+        else:
+            print(row['moves'] if row['moves'] is not None else 'NOT_FOUND', flush=True)
+
+
+if __name__ == '__main__':
+    main()
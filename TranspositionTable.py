@@ -0,0 +1,102 @@
+ENTRY_BYTES = 136  # Rough size of one slot: five list pointers plus the key, g and h int objects
+
+REPLACEMENT_POLICIES = ('depth', 'always')
+
+
+def _prime_at_most(n):
+    """
+        Packed keys hash to themselves, a prime table size makes every tile count in the slot
+    """
+    for candidate in range(max(n, 2), 1, -1):
+        if all(candidate % d for d in range(2, int(candidate ** 0.5) + 1)):
+            return candidate
+    return 2
+
+
+class TranspositionTable:
+    """
+        Fixed (prime) number of slots addressed by the hash of a compact state key. A slot keeps the key,
+        the lowest g it was reached at, a lower bound h on its distance to the goal (the backed-up
+        f-bound minus g), the parent it holds for and the stamp (IDA* iteration) it was stored in.
+        Searches that never move back to the parent back up bounds that only hold for paths entering
+        the state from that parent, so a solver reads h only when it enters from parents[slot].
+        A None parent (searches that generate every move) holds for every way in.
+        On a collision the 'depth' policy keeps the entry closer to the root of the current stamp,
+        'always' overwrites it
+    """
+    def __init__(self, max_entries=None, max_bytes=None, policy='depth'):
+        if policy not in REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown replacement policy '{policy}'")
+        if max_entries is None:
+            max_entries = (max_bytes or 64 << 20) // ENTRY_BYTES
+        self.size = _prime_at_most(max_entries)
+        self.policy = policy
+        self.keys = [None] * self.size
+        self.gs = [0] * self.size
+        self.hs = [0] * self.size
+        self.parents = [None] * self.size
+        self.stamps = [0] * self.size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        """
+            Empties the slots in place for the search of another board, whose stamps start over
+        """
+        size = self.size
+        self.keys[:] = [None] * size
+        self.parents[:] = [None] * size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def probe(self, key):
+        """
+            Slot of the key, or -1 if it is not in the table
+        """
+        slot = hash(key) % self.size
+        if self.keys[slot] == key:
+            self.hits += 1
+            return slot
+        self.misses += 1
+        return -1
+
+    def store(self, key, g, h, stamp=0, parent=None):
+        slot = hash(key) % self.size
+        stored = self.keys[slot]
+        if stored == key:
+            if self.stamps[slot] != stamp or g < self.gs[slot]:
+                self.gs[slot] = g
+            if parent != self.parents[slot]:  # The stored bound holds for another way in only
+                self.hs[slot] = h
+                self.parents[slot] = parent
+            elif h > self.hs[slot]:
+                self.hs[slot] = h
+            self.stamps[slot] = stamp
+            return
+        if stored is not None:
+            if self.policy == 'depth' and self.stamps[slot] == stamp and self.gs[slot] < g:
+                return
+            self.evictions += 1
+        self.keys[slot] = key
+        self.gs[slot] = g
+        self.hs[slot] = h
+        self.parents[slot] = parent
+        self.stamps[slot] = stamp
+
+    def raise_bound(self, key, h, parent=None):
+        """
+            Raises the stored h of the key to a bound backed up from its subtree, entered from parent
+        """
+        slot = hash(key) % self.size
+        if self.keys[slot] == key and self.parents[slot] == parent and h > self.hs[slot]:
+            self.hs[slot] = h
+
+    def stats(self):
+        return {
+            'tt_hits': self.hits,
+            'tt_misses': self.misses,
+            'tt_evictions': self.evictions,
+            'tt_entries': sum(1 for key in self.keys if key is not None)
+        }
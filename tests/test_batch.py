@@ -0,0 +1,19 @@
+import pytest
+
+from Batch import solve_many, solve_one
+from TranspositionTable import TranspositionTable
+
+BOARDS = [(8, 6, 7, 2, 5, 4, 3, 0, 1), (1, 0, 2, 8, 5, 6, 7, 4, 3), (7, 5, 4, 6, 1, 0, 2, 3, 8), (1, 2, 0, 3, 4, 5, 6, 7, 8)]
+
+
+@pytest.mark.parametrize('solver', ['idastar', 'rbfs', 'astar', 'smastar', 'bidirectional'])
+def test_reused_solver_matches_a_new_one(solver):
+    # A reset solver keeps nothing of the previous board, transposition table entries included
+    kwargs = {'transposition_table': TranspositionTable(1000)} if solver in ('idastar', 'rbfs') else {}
+    rows = list(solve_many(BOARDS, solver, **kwargs))
+    for board, row in zip(BOARDS, rows):
+        if kwargs:
+            kwargs = {'transposition_table': TranspositionTable(1000)}
+        fresh = solve_one(board, solver, **kwargs)
+        assert (row['actual_cost'], row['expanded_nodes'], row['moves']) == \
+            (fresh['actual_cost'], fresh['expanded_nodes'], fresh['moves'])
@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from Instances import is_solvable_batch, random_instances, random_walk_instances
+
+
+@pytest.mark.parametrize('dim', [3, 4])
+def test_no_instances(dim):
+    for tiles in (random_instances(0, dim), random_walk_instances(0, 10, dim)):
+        assert tiles.shape == (0, dim * dim)
+        assert np.issubdtype(tiles.dtype, np.integer)
+
+
+@pytest.mark.parametrize('dim', [3, 4])
+def test_random_instances_are_solvable_and_reproducible(dim):
+    tiles = random_instances(50, dim, seed=7)
+    assert tiles.shape == (50, dim * dim)
+    assert is_solvable_batch(tiles).all()
+    assert (random_instances(10, dim, seed=7, first=40) == tiles[40:]).all()
@@ -0,0 +1,48 @@
+import json
+
+import numpy as np
+
+from IDAstar import IDAStarSolver
+from NPuzzle import Board
+from Profiler import SearchProfiler, solver_results
+from PuzzleState import PuzzleState
+from Saar.NPuzzle import Board as SaarBoard
+from Saar.RBFS import RBFSSolver
+
+TILES = (8, 6, 7, 2, 5, 4, 3, 0, 1)  # 27 moves from the zero-first goal
+
+
+def test_idastar_reports_samples_and_iterations():
+    board = Board(size=3, tiles=np.array(TILES).reshape(3, 3))
+    board.set_f('manhattan')
+    solver = IDAStarSolver(board, profiler=SearchProfiler(sample_interval=64), track_history=False)
+    cost = solver.solve()
+    row = solver_results(solver, 'idastar_manhattan', cost, 0)
+
+    samples = json.loads(row['prof_samples'])
+    assert samples and all(generated > 0 for _, generated in samples)
+    iterations = json.loads(row['prof_iteration_stats'])
+    assert len(iterations) == row['prof_iterations'] > 1
+    assert iterations[-1]['result'] == 'FOUND' and iterations[-1]['threshold'] == cost
+    assert sum(stats['generated'] for stats in iterations) == row['prof_generated']
+    assert row['prof_time_heuristic'] > 0
+
+
+def test_in_place_rbfs_times_the_heuristic():
+    board = SaarBoard(np.array((4, 1, 3, 7, 2, 6, 0, 5, 8)).reshape(3, 3))
+    solver = RBFSSolver(board, profiler=SearchProfiler(sample_interval=4), track_history=False)
+    cost = solver.solve()
+    row = solver_results(solver, 'rbfs_manhattan', cost, 0)
+
+    assert row['prof_time_heuristic'] > 0
+    assert json.loads(row['prof_samples'])
+    assert sum(json.loads(row['prof_backtrack_depths']).values()) == row['prof_backtracks']
+
+
+def test_in_place_rbfs_times_the_heuristic_of_puzzle_states():
+    state = PuzzleState.from_tiles((4, 1, 3, 7, 2, 6, 0, 5, 8), (1, 2, 3, 4, 5, 6, 7, 8, 0))
+    solver = RBFSSolver(state, profiler=SearchProfiler(), track_history=False)
+    cost = solver.solve()
+    row = solver_results(solver, 'rbfs_manhattan', cost, 0)
+
+    assert cost == len(solver.solution) and row['prof_time_heuristic'] > 0
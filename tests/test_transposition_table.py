@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from DistanceOracle import get_oracle, validate
+from IDAstar import IDAStarSolver
+from NPuzzle import Board
+from Saar.NPuzzle import Board as SaarBoard
+from Saar.RBFS import RBFSSolver
+from TranspositionTable import REPLACEMENT_POLICIES, TranspositionTable
+
+# Boards whose optimal cost IDA* missed while bounds backed up without the move back to the parent
+# were reused from other parents
+REGRESSIONS = [((1, 0, 2, 8, 5, 6, 7, 4, 3), 'manhattan'), ((7, 5, 4, 6, 1, 0, 2, 3, 8), 'hamming')]
+
+
+def random_tiles(count, seed=0):
+    rng = np.random.default_rng(seed)
+    oracle = get_oracle(None, 3)
+    boards = []
+    while len(boards) < count:
+        tiles = [int(tile) for tile in rng.permutation(9)]
+        if oracle.is_solvable(tiles):
+            boards.append(tuple(tiles))
+    return boards
+
+
+def board(tiles):
+    res = Board(size=3, tiles=np.array(tiles).reshape(3, 3))
+    res.set_f('manhattan')
+    return res
+
+
+@pytest.mark.parametrize('policy', REPLACEMENT_POLICIES)
+@pytest.mark.parametrize('size', [7, 1000])
+@pytest.mark.parametrize('tiles,heuristic', REGRESSIONS + [(tiles, 'manhattan') for tiles in random_tiles(10)])
+def test_idastar_with_table_is_optimal(tiles, heuristic, size, policy):
+    solver = IDAStarSolver(board(tiles), heuristic, track_history=False,
+                           transposition_table=TranspositionTable(size, policy=policy))
+    cost = solver.solve()
+    assert validate(board(tiles), cost, solver.solution)
+
+
+# The recursive RBFS regenerates far more nodes, a collision-heavy table makes it minutes per board
+@pytest.mark.parametrize('size,in_place', [(7, True), (1000, True), (1000, False)])
+@pytest.mark.parametrize('tiles', [tiles for tiles in random_tiles(20, seed=1)
+                                   if SaarBoard(np.array(tiles).reshape(3, 3)).is_solvable()][:8])
+def test_rbfs_with_table_is_optimal(tiles, size, in_place):
+    solver = RBFSSolver(SaarBoard(np.array(tiles).reshape(3, 3)), transposition_table=TranspositionTable(size),
+                        in_place=in_place, track_history=False)
+    cost = solver.solve()
+    assert validate(SaarBoard(np.array(tiles).reshape(3, 3)), cost, solver.solution)
+
+
+def test_raised_bound_holds_for_its_parent_only():
+    table = TranspositionTable(1000)
+    table.store(42, 3, 5, parent=1)
+    table.raise_bound(42, 9, parent=2)
+    table.raise_bound(42, 8, parent=1)
+    slot = table.probe(42)
+    assert (table.hs[slot], table.parents[slot]) == (8, 1)
+    table.store(42, 3, 5, parent=2)
+    assert (table.hs[slot], table.parents[slot]) == (5, 2)